@@ -4,66 +4,60 @@ import json
 import requests
 import tempfile
 import pandas as pd
-import time
-import openai
-from main_final import process_resume
-from utils.retrieve_doc import get_all_documents
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from main_final import process_resume, get_llm_backend, RETRY_MAX_ATTEMPTS
+from utils.retry import StageError
+from utils.retrieve_doc import get_documents_page, get_document_by_object_id
+from utils.mongo_client import get_client, get_collection
+from utils.mongo_indexes import ensure_indexes
 from utils.export_excel import export_to_excel
+from utils import analytics
+from knowledge.converter_pool import warm_converters
+from utils.drive import list_drive_files, download_drive_file, DRIVE_DOWNLOAD_WORKERS
+from utils.drive_sync import sync_folder
+from utils import metrics
+from utils.metrics import timer, start_metrics_server
 
-API_KEY = os.getenv("GDRIVE_API_KEY")
-DRIVE_API_URL = "https://www.googleapis.com/drive/v3/files"
+SAVED_PAGE_SIZE = int(os.getenv("SAVED_PAGE_SIZE", "20"))
+DRIVE_LIST_TTL = int(os.getenv("DRIVE_LIST_TTL", "300"))
+SAVED_LIST_TTL = int(os.getenv("SAVED_LIST_TTL", "60"))
+ANALYTICS_TTL = int(os.getenv("ANALYTICS_TTL", "300"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+DOCLING_PRELOAD = os.getenv("DOCLING_PRELOAD", "1").lower() in ("1", "true", "yes")
 
-# ----- Google Drive API Helper Functions -----
-def list_drive_files(folder_id):
+@st.cache_resource
+def init_shared_resources():
     """
-    List all public files in a specific Google Drive folder using an API key.
-    Returns a list of files with name, id, and modifiedTime.
+    Create the long-lived, process-wide objects once per server process
+    instead of on every rerun: Mongo client (+ indexes), LLM backend,
+    docling converters (loaded in the background so the first upload
+    doesn't pay for it), and the /metrics endpoint if METRICS_PORT is set.
     """
-    files = []
-    page_token = None
-    
-    while True:
-        params = {
-            'q': f"'{folder_id}' in parents and trashed=false",
-            'fields': 'nextPageToken,files(id,name,modifiedTime)',
-            'key': API_KEY,
-            'orderBy': 'modifiedTime desc',
-            'pageToken': page_token if page_token else ''
-        }
-        response = requests.get(DRIVE_API_URL, params=params)
-        response.raise_for_status()  
-        
-        data = response.json()
-        for file in data.get('files', []):
-            files.append({
-                'name': file['name'],
-                'id': file['id'],
-                'modifiedTime': file.get('modifiedTime', 'N/A')
-            })
-        
-        page_token = data.get('nextPageToken')
-        if not page_token:
-            break
-    
-    return files
+    start_metrics_server()
+    mongo_client = get_client()
+    ensure_indexes(get_collection())
+    llm_backend = get_llm_backend()
+    warm_thread = warm_converters() if DOCLING_PRELOAD else None
+    return {"mongo_client": mongo_client, "llm_backend": llm_backend, "docling_warmup": warm_thread}
 
-def download_drive_file(file_id, file_name):
-    """
-    Download a file from Google Drive to a temporary location using an API key.
-    Returns the path to the temporary file.
-    """
-    download_url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media&key={API_KEY}"
-    response = requests.get(download_url, stream=True)
-    response.raise_for_status()
-    
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1])
-    for chunk in response.iter_content(chunk_size=8192):
-        if chunk:
-            temp_file.write(chunk)
-    temp_file.close()
-    
-    return temp_file.name
-# ----- End Google Drive Helpers -----
+@st.cache_data(ttl=DRIVE_LIST_TTL, show_spinner=False)
+def cached_list_drive_files(folder_id):
+    return list_drive_files(folder_id)
+
+@st.cache_data(ttl=SAVED_LIST_TTL, show_spinner=False)
+def cached_documents_page(page_size, after):
+    return get_documents_page(page_size, after=after)
+
+@st.cache_data(ttl=ANALYTICS_TTL, show_spinner=False)
+def cached_analytics(hours, slowest_limit):
+    return {
+        "per_hour": analytics.resumes_per_hour(hours),
+        "by_format": analytics.tokens_by_format(hours),
+        "slowest": analytics.slowest_files(slowest_limit, hours),
+        "latency": analytics.latency_percentiles(hours),
+    }
+
+init_shared_resources()
 
 def convert_to_dataframe(parsed_json):
     if isinstance(parsed_json, list):
@@ -73,20 +67,32 @@ def convert_to_dataframe(parsed_json):
     else:
         return pd.DataFrame([parsed_json])
 
-def process_with_retry(temp_file_path, file_name, max_retries=2):
-    retries = 0
-    while retries < max_retries:
-        try:
-            result_dict = process_resume(temp_file_path, file_name)
-            return result_dict
-        except openai.LengthFinishReasonError as e:
-            retries += 1
-            st.warning(f"Error processing {file_name}, retrying {retries}/{max_retries}.")
-            if retries < max_retries:
-                time.sleep(5)
-            else:
-                st.error(f"Failed to process {file_name} after {max_retries} retries.")
-                return None
+def show_message(level, text):
+    if level == "warning":
+        st.warning(text)
+    else:
+        st.error(text)
+
+def process_with_retry(temp_file_path, file_name, on_stage=None, on_message=None):
+    """
+    Run process_resume, whose stages retry transient failures (rate limits,
+    timeouts, connection errors) with backoff; a retry only repeats the
+    stage that failed. on_stage is forwarded to process_resume.
+    on_message(level, text) receives warnings/errors; it defaults to
+    st.warning/st.error and must be given when running outside the
+    Streamlit script thread.
+    """
+    if on_message is None:
+        on_message = show_message
+
+    def on_retry(stage, attempt, delay, error):
+        on_message("warning", f"{file_name}: {stage} failed ({error}), retrying in {delay:.1f}s ({attempt}/{RETRY_MAX_ATTEMPTS - 1}).")
+
+    try:
+        return process_resume(temp_file_path, file_name, on_stage=on_stage, on_retry=on_retry)
+    except StageError as e:
+        on_message("error", f"Failed to process {file_name}: {e}")
+        return None
 
 def display_llm_output(parsed_json, time_stats, inserted_id, unique_id):
     st.subheader("個人情報")
@@ -112,14 +118,157 @@ def display_llm_output(parsed_json, time_stats, inserted_id, unique_id):
         st.markdown(f"**カテゴリ:** {category}")
         st.dataframe(pd.DataFrame.from_dict(skills, orient='index'))
     st.subheader("時間統計")
-    st.json(time_stats)
+    # llm_calls carries datetimes; st.json needs plain JSON.
+    st.json(json.loads(json.dumps(time_stats, default=str)))
     st.write(f"**MongoDBに保存されたID:** `{inserted_id}`")
     st.write(f"**Unique ID:** `{unique_id}`")
 
+STAGE_LABELS = {
+    "queued": "⏳ 待機中 (queued)",
+    "downloading": "⬇️ ダウンロード中 (downloading)",
+    "parsing": "📄 解析中 (parsing)",
+    "llm": "🔮 LLM処理中 (LLM)",
+    "storing": "💾 保存中 (storing)",
+    "stored": "✅ 完了 (stored)",
+    "failed": "❌ 失敗 (failed)",
+}
+
+def render_status_table(placeholder, progress_bar, status):
+    finished = sum(1 for stage in status.values() if stage in ("stored", "failed"))
+    progress_bar.progress(finished / len(status), text=f"{finished}/{len(status)} 件完了")
+    placeholder.dataframe(pd.DataFrame(
+        [{"File": name, "Status": STAGE_LABELS.get(stage, stage)} for name, stage in status.items()]
+    ))
+
+def render_upload_result(file_name, result_dict, show_export=True):
+    llm_output = result_dict["llm_output"]
+    time_stats = result_dict["time_stats"]
+    unique_id = result_dict["unique_id"]
+    inserted_id = result_dict["inserted_id"]
+
+    st.subheader(f"### LLM 出力: **{file_name}**")
+    if result_dict.get("duplicate_of"):
+        st.info(f"同一の履歴書が既に保存されています (ID: `{result_dict['duplicate_of']}`)。保存済みの結果を表示します。")
+    try:
+        loaded_json = json.loads(llm_output)
+        if "parsed" in loaded_json:
+            parsed_json = loaded_json["parsed"]
+            display_llm_output(parsed_json, time_stats, inserted_id, unique_id)
+            st.markdown("---")
+
+            if show_export and st.button(f"Export to Excel: {file_name}"):
+                output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx").name
+                
+                with timer(metrics.STAGE_SECONDS, stage="export"):
+                    excel_file = export_to_excel(parsed_json, output_file)
+                
+                st.download_button(
+                    label="Download Excel",
+                    data=open(excel_file, "rb").read(),
+                    file_name=f"{file_name}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+        else:
+            st.error("期待される 'parsed' キーがLLM出力に見つかりませんでした。")
+    except json.JSONDecodeError:
+        st.error("JSONの解析に失敗しました。下記に生データを表示します:")
+        st.text_area("LLM 出力 (生データ)", llm_output, height=300)
+
+def _run_file_job(name, prepare, status, messages):
+    """
+    Worker-thread body: obtain the file (prepare(on_stage) returns a local
+    path, e.g. after writing an upload or downloading from Drive), then
+    process it. Returns (result_dict, temp_file_path).
+    """
+    on_stage = lambda stage: status.__setitem__(name, stage)
+    temp_file_path = prepare(on_stage)
+    result_dict = process_with_retry(
+        temp_file_path,
+        name,
+        on_stage=on_stage,
+        on_message=lambda level, text: messages[name].append((level, text)),
+    )
+    return result_dict, temp_file_path
+
+def process_files_concurrently(jobs, remember=True, cleanup=False):
+    """
+    Run [(file_name, prepare), ...] on a bounded thread pool (UPLOAD_WORKERS),
+    showing a live status table and rendering each result as soon as it
+    finishes. Worker threads never call Streamlit; they only update the
+    shared status/message dicts, which this (script) thread renders.
+    remember stores results in session state (upload tab); cleanup deletes
+    each temp file once processed (Drive tab).
+    Returns the set of file names rendered.
+    """
+    status = {name: "queued" for name, _ in jobs}
+    messages = {name: [] for name, _ in jobs}
+    progress_bar = st.progress(0.0)
+    status_placeholder = st.empty()
+    results_container = st.container()
+    render_status_table(status_placeholder, progress_bar, status)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        futures = {
+            pool.submit(_run_file_job, name, prepare, status, messages): name
+            for name, prepare in jobs
+        }
+
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                temp_file_path = None
+                try:
+                    result_dict, temp_file_path = future.result()
+                except Exception as e:
+                    messages[name].append(("error", f"{name}: {e}"))
+                    result_dict = None
+
+                with results_container:
+                    with st.expander(f"### 処理中: **{name}**"):
+                        for level, text in messages[name]:
+                            show_message(level, text)
+                        if result_dict is None:
+                            status[name] = "failed"
+                            st.error(f"Could not process {name} after multiple retries.")
+                        else:
+                            status[name] = "stored"
+                            if remember:
+                                # Store the results in session state to avoid re-running the pipeline
+                                st.session_state[name] = {
+                                    "result_dict": result_dict,
+                                    "temp_file_path": temp_file_path,
+                                    "uploaded_file_name": name
+                                }
+                            render_upload_result(name, result_dict, show_export=remember)
+                if cleanup and temp_file_path and os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+            render_status_table(status_placeholder, progress_bar, status)
+
+    # New documents were stored; don't serve a stale saved-results list.
+    cached_documents_page.clear()
+    return set(futures.values())
+
+def upload_job(uploaded_file):
+    def prepare(on_stage):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
+            tmp.write(uploaded_file.getbuffer())
+            return tmp.name
+    return uploaded_file.name, prepare
+
+def drive_job(download_future, file_name):
+    # Downloads are started up front on their own pool; each processing
+    # worker picks its file up as soon as that download lands.
+    def prepare(on_stage):
+        on_stage("downloading")
+        return download_future.result()
+    return file_name, prepare
+
 def run_app():
     st.title("Resume Parser Application (GiveryAI)")
     
-    tab1, tab2, tab3 = st.tabs(["アップロード", "保存済み結果", "Google Drive Files"])
+    tab1, tab2, tab3, tab4 = st.tabs(["アップロード", "保存済み結果", "Google Drive Files", "分析 (Analytics)"])
     
     # --- Tab 1: Manual Upload ---
     with tab1:
@@ -130,70 +279,46 @@ def run_app():
         )
 
         if uploaded_files:
+            # Check which files have been processed already
+            pending_files = [f for f in uploaded_files if f.name not in st.session_state]
+            rendered = process_files_concurrently([upload_job(f) for f in pending_files]) if pending_files else set()
+
             for uploaded_file in uploaded_files:
+                if uploaded_file.name in rendered or uploaded_file.name not in st.session_state:
+                    continue
                 with st.expander(f"### 処理中: **{uploaded_file.name}**"):
-                    # Check if the file has been processed already
-                    if uploaded_file.name not in st.session_state:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp:
-                            tmp.write(uploaded_file.getbuffer())
-                            temp_file_path = tmp.name
-
-                        with st.spinner(f"{uploaded_file.name} の処理中..."):
-                            result_dict = process_with_retry(temp_file_path, uploaded_file.name)
-
-                        if result_dict is None:
-                            st.error(f"Could not process {uploaded_file.name} after multiple retries.")
-                            continue  # Skip to the next file
-
-                        # Store the results in session state to avoid re-running the pipeline
-                        st.session_state[uploaded_file.name] = {
-                            "result_dict": result_dict,
-                            "temp_file_path": temp_file_path,
-                            "uploaded_file_name": uploaded_file.name
-                        }
-
                     # Fetch stored results
                     result_dict = st.session_state[uploaded_file.name]["result_dict"]
-                    llm_output = result_dict["llm_output"]
-                    time_stats = result_dict["time_stats"]
-                    unique_id = result_dict["unique_id"]
-                    inserted_id = result_dict["inserted_id"]
-
-                    st.subheader(f"### LLM 出力: **{uploaded_file.name}**")
-                    try:
-                        loaded_json = json.loads(llm_output)
-                        if "parsed" in loaded_json:
-                            parsed_json = loaded_json["parsed"]
-                            display_llm_output(parsed_json, time_stats, inserted_id, unique_id)
-                            st.markdown("---")
-
-                            if st.button(f"Export to Excel: {uploaded_file.name}"):
-                                output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx").name
-                                
-                                excel_file = export_to_excel(parsed_json, output_file)
-                                
-                                st.download_button(
-                                    label="Download Excel",
-                                    data=open(excel_file, "rb").read(),
-                                    file_name=f"{uploaded_file.name}.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                                )
-                        else:
-                            st.error("期待される 'parsed' キーがLLM出力に見つかりませんでした。")
-                    except json.JSONDecodeError:
-                        st.error("JSONの解析に失敗しました。下記に生データを表示します:")
-                        st.text_area("LLM 出力 (生データ)", llm_output, height=300)
+                    render_upload_result(uploaded_file.name, result_dict)
 
 
     # --- Tab 2: Saved Results ---
     with tab2:
         st.header("保存済み結果の一覧")
 
-        documents = get_all_documents()
+        # Stack of page cursors; the last entry is the current page (None = first page).
+        if "saved_cursor_stack" not in st.session_state:
+            st.session_state["saved_cursor_stack"] = [None]
+        cursor_stack = st.session_state["saved_cursor_stack"]
 
-        if documents:
+        if st.button("🔄 更新", key="refresh_saved"):
+            cached_documents_page.clear()
+
+        documents, next_cursor = cached_documents_page(SAVED_PAGE_SIZE, cursor_stack[-1])
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("◀ 前へ", disabled=len(cursor_stack) == 1):
+                cursor_stack.pop()
+                st.rerun()
+        with page_col:
+            st.write(f"ページ {len(cursor_stack)}")
+        with next_col:
+            if st.button("次へ ▶", disabled=next_cursor is None):
+                cursor_stack.append(next_cursor)
+                st.rerun()
 
-            documents.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
+        if documents:
 
             for doc in documents:
                 _id = str(doc.get("_id"))
@@ -212,9 +337,11 @@ def run_app():
                     """, unsafe_allow_html=True)
 
                     if st.button(f"View Parsed Data for Unique ID: {unique_id}"):
+                        # Only the opened row loads its full document.
+                        full_doc = get_document_by_object_id(_id) or {}
                         st.subheader(f"パース結果: {_id}")
-                        stored_llm_output = doc.get("llm_output", {})
-                        time_stats = doc.get("time_stats", {})
+                        stored_llm_output = full_doc.get("llm_output", {})
+                        time_stats = full_doc.get("time_stats", {})
                         display_llm_output(stored_llm_output, time_stats, _id, unique_id)
                         st.markdown("---")
 
@@ -228,8 +355,32 @@ def run_app():
         folder_id = st.text_input("Google Drive Folder ID", "1hCurZKwbn8OXm3fdD4n0I376kB3iPNsx")
         
         if folder_id:
+            if st.button("新規・更新ファイルのみ同期 (Incremental Sync)"):
+                with st.spinner("Syncing new and changed files from Google Drive..."):
+                    try:
+                        sync_results = sync_folder(folder_id)
+                        cached_documents_page.clear()
+                    except requests.exceptions.HTTPError as e:
+                        sync_results = None
+                        st.error(f"Error accessing Google Drive: {e}")
+                if sync_results is not None:
+                    if sync_results:
+                        st.dataframe(pd.DataFrame([
+                            {
+                                "File Name": r["file_name"],
+                                "Unique ID": r.get("unique_id", ""),
+                                "Error": r.get("error", ""),
+                            }
+                            for r in sync_results
+                        ]))
+                    else:
+                        st.write("新規・更新ファイルはありません。")
+
+            if st.button("🔄 Refresh file list", key="refresh_drive"):
+                cached_list_drive_files.clear()
+
             try:
-                drive_files = list_drive_files(folder_id)
+                drive_files = cached_list_drive_files(folder_id)
                 if drive_files:
                     drive_df = pd.DataFrame(drive_files)
                     drive_df.rename(columns={
@@ -244,45 +395,60 @@ def run_app():
 
                     if selected_files:
                         if st.button("Process Selected Files"):
-                            for sel in selected_files:
-                                # Split on " (ID: " to separate file name and ID
-                                file_name = sel.split(" (ID: ")[0]
-                                file_id = sel.split(" (ID: ")[1].rstrip(")")  # Remove the closing parenthesis
-                                with st.expander(f"### 処理中: **{file_name}**"):    
-                                    with st.spinner(f"Downloading {file_name} from Google Drive..."):
-                                        temp_file_path = download_drive_file(file_id, file_name)
-                                    
-                                    with st.spinner(f"{file_name} の処理中..."):
-                                        result_dict = process_with_retry(temp_file_path, file_name)
-                                    
-                                    if result_dict:
-                                        llm_output = result_dict["llm_output"]
-                                        time_stats = result_dict["time_stats"]
-                                        unique_id = result_dict["unique_id"]
-                                        inserted_id = result_dict["inserted_id"]
-                                        
-                                        st.subheader(f"### LLM 出力: **{file_name}**")
-                                        try:
-                                            loaded_json = json.loads(llm_output)
-                                            if "parsed" in loaded_json:
-                                                parsed_json = loaded_json["parsed"]
-                                                display_llm_output(parsed_json, time_stats, inserted_id, unique_id)
-                                                st.markdown("---")
-                                            else:
-                                                st.error("期待される 'parsed' キーがLLM出力に見つかりませんでした。")
-                                        except json.JSONDecodeError:
-                                            st.error("JSONの解析に失敗しました。下記に生データを表示します:")
-                                            st.text_area("LLM 出力 (生データ)", llm_output, height=300)
-                                    else:
-                                        st.error(f"Could not process {file_name} after multiple retries.")
-                                    # Clean up temp file
-                                    if os.path.exists(temp_file_path):
-                                        os.remove(temp_file_path)
+                            with ThreadPoolExecutor(max_workers=DRIVE_DOWNLOAD_WORKERS) as download_pool:
+                                jobs = []
+                                for sel in selected_files:
+                                    # Split on " (ID: " to separate file name and ID
+                                    file_name = sel.split(" (ID: ")[0]
+                                    file_id = sel.split(" (ID: ")[1].rstrip(")")  # Remove the closing parenthesis
+                                    download_future = download_pool.submit(download_drive_file, file_id, file_name)
+                                    jobs.append(drive_job(download_future, file_name))
+                                process_files_concurrently(jobs, remember=False, cleanup=True)
                 else:
                     st.write("No files found in the specified folder. Ensure the folder is publicly accessible.")
             except requests.exceptions.HTTPError as e:
                 st.error(f"Error accessing Google Drive: {e}")
                 st.write("Ensure the folder is publicly accessible and the API key is correct.")
 
+    # --- Tab 4: Throughput / token / latency analytics (aggregated in Mongo) ---
+    with tab4:
+        st.header("処理実績の分析")
+        period_col, refresh_col = st.columns([3, 1])
+        with period_col:
+            hours = st.selectbox(
+                "集計期間", [24, 24 * 7, 24 * 30], index=1,
+                format_func=lambda h: f"{h // 24}日間"
+            )
+        with refresh_col:
+            if st.button("🔄 更新", key="refresh_analytics"):
+                cached_analytics.clear()
+
+        data = cached_analytics(hours, 10)
+
+        st.subheader("時間あたりの処理件数")
+        per_hour = pd.DataFrame(data["per_hour"])
+        if per_hour.empty:
+            st.write("この期間のデータはありません。")
+        else:
+            st.bar_chart(per_hour.set_index("hour")[["resumes"]])
+            st.caption(f"合計 {int(per_hour['resumes'].sum())} 件 / {int(per_hour['total_tokens'].sum()):,} tokens")
+
+        st.subheader("入力形式ごとのトークン数 (1件あたり平均)")
+        by_format = pd.DataFrame(data["by_format"])
+        if not by_format.empty:
+            st.bar_chart(by_format.set_index("input_format")[["avg_prompt_tokens", "avg_completion_tokens"]])
+            st.dataframe(by_format.round(0), hide_index=True)
+
+        st.subheader("処理時間のパーセンタイル (日別, 秒)")
+        latency = pd.DataFrame(data["latency"])
+        if not latency.empty:
+            st.line_chart(latency.set_index("period")[["p50", "p95"]])
+            st.dataframe(latency.round(2), hide_index=True)
+
+        st.subheader("処理時間の長いファイル")
+        slowest = pd.DataFrame(data["slowest"])
+        if not slowest.empty:
+            st.dataframe(slowest, hide_index=True)
+
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Pipeline benchmarks over the sample corpus (output_pdfs/ by default).
+
+Each stage is timed in isolation, then process_resume() end to end:
+  parse/<ext>:<extractor>  parse_file() without the parse cache
+  prepare                  compact_input() + text_hash() on the parsed text
+  llm                      call_openai() against the mock backend (no LLM cache)
+  store                    store_in_mongo() into mongomock
+  export                   export_to_excel() of final_output.json
+  end_to_end               process_resume() with mock LLM + mongomock, caches cleared
+
+The first call of a stage is reported as a single "cold" time (imports,
+model loads, client creation), the rest as "warm" percentiles. Memory is
+reported per stage as the change in resident set size, next to the
+process-wide peak so far, and module import times are recorded alongside
+(see utils/import_report.py). Results are written as JSON so runs can be
+compared across commits:
+
+  python -m benchmarks.run_benchmarks --iterations 5
+  python -m benchmarks.run_benchmarks --compare benchmarks/results/<old>.json
+
+The exit status is 1 if any stage failed or, with --compare, got slower.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import resource
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+REFERENCE_OUTPUT = os.path.join(REPO_ROOT, "final_output.json")
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "output_pdfs")
+# A stage whose warm p50 grows by more than this is flagged by --compare.
+REGRESSION_THRESHOLD = 0.10
+
+
+#Measurement
+def peak_rss_mb():
+    """
+    Peak RSS of the whole process so far (not of any one stage).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_rss_mb():
+    """
+    Current RSS, or None where /proc isn't available (e.g. macOS).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * resource.getpagesize() / (1024 * 1024)
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = (len(ordered) - 1) * q
+    lower, upper = int(index), min(int(index) + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+def summarize(samples):
+    if not samples:
+        return None
+    return {
+        "n": len(samples),
+        "p50": percentile(samples, 0.5),
+        "p95": percentile(samples, 0.95),
+        "mean": sum(samples) / len(samples),
+        "throughput_per_s": len(samples) / sum(samples) if sum(samples) else None,
+    }
+
+def measure(func, inputs, iterations):
+    """
+    Call func(item) for every item, iterations times over the inputs.
+    The very first call is the cold sample (one value, no percentiles);
+    all later ones are warm.
+    """
+    rss_before = current_rss_mb()
+    samples = []
+    for _ in range(iterations):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - start)
+    rss_after = current_rss_mb()
+    return {
+        "cold_seconds": samples[0] if samples else None,
+        "warm": summarize(samples[1:]),
+        "rss_delta_mb": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "process_peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_stage(results, name, func, inputs, iterations):
+    print(f"⏱️ {name} ({len(inputs)} input(s) x {iterations})...")
+    try:
+        results[name] = measure(func, inputs, iterations)
+    except Exception as e:
+        print(f"⚠️ {name} skipped: {e}")
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+        return False
+    warm = results[name]["warm"]
+    if warm:
+        print(f"   cold {results[name]['cold_seconds'] * 1000:.1f} ms, "
+              f"warm p50 {warm['p50'] * 1000:.1f} ms, p95 {warm['p95'] * 1000:.1f} ms")
+    else:
+        print(f"   cold {results[name]['cold_seconds'] * 1000:.1f} ms (no warm samples)")
+    return True
+
+
+#Stages
+def configure_environment(workdir, mock_latency_ms):
+    """
+    Must run before main_final is imported: caches go to workdir, the LLM
+    cache is off, the mock backend answers with final_output.json and Mongo
+    is mongomock.
+    """
+    os.environ["PARSE_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["LLM_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["LLM_BACKEND"] = "mock"
+    os.environ["MOCK_LLM_RESPONSE_FILE"] = REFERENCE_OUTPUT
+    os.environ["MOCK_LLM_LATENCY_MS"] = str(mock_latency_ms)
+    os.environ["MOCK_LLM_ERROR_RATE"] = "0"
+    os.environ["MONGODB_URI"] = "mongomock://localhost"
+    os.environ["DOCLING_PRELOAD"] = "0"
+
+def corpus_files(corpus_dir, extensions):
+    by_extension = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        extension = os.path.splitext(name)[1].lower()
+        if extension in extensions:
+            by_extension.setdefault(extension, []).append(os.path.join(corpus_dir, name))
+    return by_extension
+
+def run_benchmarks(corpus_dir, iterations, mock_latency_ms):
+    workdir = tempfile.mkdtemp(prefix="resume_bench_")
+    configure_environment(workdir, mock_latency_ms)
+    # process_resume() writes final_output_<id>.json into the working directory.
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    import main_final
+    from utils.export_excel import export_to_excel
+
+    results = {}
+    files = corpus_files(corpus_dir, main_final.EXTRACTORS)
+    parsed_texts = []
+    for extension, paths in files.items():
+        extractor = main_final.EXTRACTORS[extension][0]
+        if extension == ".pdf":
+            # Routed per file by select_pdf_extractor() unless PDF_ENGINE forces one.
+            extractor = main_final.PDF_ENGINE
+        ok = run_stage(
+            results, f"parse/{extension.lstrip('.')}:{extractor}",
+            lambda path: main_final.parse_file(path, use_cache=False), paths, iterations
+        )
+        if ok:
+            parsed_texts.extend(main_final.parse_file(path, use_cache=False) for path in paths)
+
+    if parsed_texts:
+        run_stage(
+            results, "prepare",
+            lambda text: (main_final.compact_input(text), main_final.text_hash(text)), parsed_texts, iterations
+        )
+    llm_inputs = [main_final.compact_input(text) for text in parsed_texts] or ["(empty)"]
+    run_stage(
+        results, "llm",
+        lambda text: main_final.call_openai(main_final.RESUME_EXTRACTION_PROMPT, text, {}, use_cache=False),
+        llm_inputs, iterations
+    )
+
+    with open(REFERENCE_OUTPUT, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    llm_output = json.dumps({"parsed": reference}, ensure_ascii=False)
+    run_stage(
+        results, "store",
+        lambda i: main_final.store_in_mongo(f"bench_{i}_{time.time_ns()}", "bench.pdf", None, llm_output, {"bench": True}),
+        list(range(10)), iterations
+    )
+    run_stage(
+        results, "export",
+        lambda i: export_to_excel(reference, os.path.join(workdir, f"export_{i}.xlsx")),
+        list(range(3)), iterations
+    )
+
+    def end_to_end(path):
+        main_final.parse_cache.clear()
+        main_final.process_resume(path, os.path.basename(path), dedup="off")
+    run_stage(results, "end_to_end", end_to_end, [p for paths in files.values() for p in paths], iterations)
+    return results
+
+
+#Reporting
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, previous, threshold=REGRESSION_THRESHOLD):
+    """
+    Print warm p50 per stage against an earlier results file and return the
+    names of stages that got slower by more than threshold.
+    """
+    regressions = []
+    print(f"\n📊 vs {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')})")
+    for name, stage in current["stages"].items():
+        old = previous["stages"].get(name) or {}
+        new_p50 = (stage.get("warm") or {}).get("p50")
+        old_p50 = (old.get("warm") or {}).get("p50")
+        if not new_p50 or not old_p50:
+            print(f"   {name}: n/a")
+            continue
+        change = new_p50 / old_p50 - 1
+        flag = "🔺" if change > threshold else ("🟢" if change < -threshold else "  ")
+        print(f"{flag} {name}: {old_p50 * 1000:.1f} → {new_p50 * 1000:.1f} ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the resume pipeline stage by stage.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--mock-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    corpus = os.path.abspath(args.corpus)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    commit = git_commit()
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": timestamp,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": corpus,
+            "iterations": args.iterations,
+            "mock_latency_ms": args.mock_latency_ms,
+        },
+        "stages": run_benchmarks(corpus, args.iterations, args.mock_latency_ms),
+    }
+    report["meta"]["process_peak_rss_mb"] = peak_rss_mb()
+    # Extractor imports paid inside this run, and each tracked module imported
+    # alone in a fresh interpreter (python -X importtime).
+    from utils.import_report import import_report
+    report["imports"] = {
+        "first_dispatch": dict(sys.modules["main_final"].IMPORT_TIMES),
+        "fresh_interpreter": import_report(),
+    }
+
+    if output_path is None:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(BENCHMARK_RESULTS_DIR, f"{timestamp}_{commit or 'nogit'}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Results written to {output_path}")
+
+    failed = [name for name, stage in report["stages"].items() if "error" in stage]
+    for name in failed:
+        print(f"❌ {name}: {report['stages'][name]['error']}")
+    regressions = []
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f))
+    sys.exit(1 if failed or regressions else 0)
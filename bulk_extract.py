@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main_final import (
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    DEDUP_MODE,
+    BATCH_PARSE_WORKERS,
+    EXTRACTORS,
+    RESUME_EXTRACTION_PROMPT,
+    ResumeSchema,
+    hash_file,
+    parse_with_stats,
+    compact_input,
+    generate_unique_id,
+    store_in_mongo_buffered,
+    record_llm_usage,
+)
+from utils.dedup import text_hash, find_duplicate
+from utils.mongo_client import get_collection
+from utils.sections import to_llm_output
+from utils.batch_backend import get_batch_backend, TERMINAL_STATUSES
+
+# The Batch API accepts at most 50,000 requests per input file.
+BULK_MAX_REQUESTS = int(os.getenv("BULK_MAX_REQUESTS", "50000"))
+BULK_POLL_INTERVAL = float(os.getenv("BULK_POLL_INTERVAL", "60"))
+BULK_OUTPUT_DIR = os.getenv("BULK_OUTPUT_DIR", os.path.join(".cache", "bulk"))
+
+
+#Manifest
+def save_manifest(manifest):
+    path = manifest["manifest_path"]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+#Requests
+def _strict_schema(schema, defs):
+    """
+    Make a pydantic JSON schema valid for structured outputs (strict mode):
+    every object closed and all its properties required, null defaults
+    dropped, single-item allOf and $ref-with-siblings inlined.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    if "$ref" in schema and len(schema) > 1:
+        # Strict mode doesn't allow keywords next to $ref.
+        name = schema.pop("$ref").rsplit("/", 1)[-1]
+        schema = {**defs[name], **schema}
+    if schema.get("type") == "object" and "additionalProperties" not in schema:
+        schema["additionalProperties"] = False
+    properties = schema.get("properties")
+    if isinstance(properties, dict):
+        schema["required"] = list(properties)
+        schema["properties"] = {key: _strict_schema(value, defs) for key, value in properties.items()}
+    if isinstance(schema.get("items"), dict):
+        schema["items"] = _strict_schema(schema["items"], defs)
+    if isinstance(schema.get("additionalProperties"), dict):
+        schema["additionalProperties"] = _strict_schema(schema["additionalProperties"], defs)
+    if "anyOf" in schema:
+        schema["anyOf"] = [_strict_schema(variant, defs) for variant in schema["anyOf"]]
+    if "allOf" in schema:
+        if len(schema["allOf"]) == 1:
+            schema.update(_strict_schema(schema.pop("allOf")[0], defs))
+        else:
+            schema["allOf"] = [_strict_schema(variant, defs) for variant in schema["allOf"]]
+    if "default" in schema and schema["default"] is None:
+        del schema["default"]
+    return schema
+
+def response_format_param(model):
+    """
+    The response_format that client.beta.chat.completions.parse() sends for
+    model, built from the model's public JSON schema (Batch API lines are
+    plain JSON, so the SDK can't add it for us).
+    """
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+    for name in list(defs):
+        defs[name] = _strict_schema(defs[name], defs)
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": _strict_schema(schema, defs), "strict": True},
+    }
+
+#Prepare
+def list_resume_files(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in EXTRACTORS
+    )
+
+def build_request(unique_id, parsed_data):
+    """
+    One Batch API line: the same structured-output chat completion that
+    call_openai() sends, keyed by the resume's unique_id.
+    """
+    return {
+        "custom_id": unique_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": OPENAI_MODEL,
+            "temperature": OPENAI_TEMPERATURE,
+            "messages": [
+                {"role": "system", "content": str(RESUME_EXTRACTION_PROMPT)},
+                {"role": "user", "content": str(parsed_data)}
+            ],
+            "response_format": response_format_param(ResumeSchema),
+        },
+    }
+
+def prepare_bulk(directory, out_dir=BULK_OUTPUT_DIR, max_workers=None):
+    """
+    Parse every resume in directory (in a process pool), skip duplicates of
+    stored resumes and of files earlier in the run, and write the requests
+    as JSONL files of at most BULK_MAX_REQUESTS lines. Returns the manifest,
+    also saved in out_dir.
+    """
+    run_dir = os.path.join(out_dir, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+    os.makedirs(run_dir, exist_ok=True)
+    manifest = {
+        "manifest_path": os.path.join(run_dir, "manifest.json"),
+        "directory": directory,
+        "entries": {},
+        "batches": [],
+        "failed": [],
+        "skipped": [],
+    }
+
+    requests = []
+    # content/text hash -> unique_id of the first file in this run with it
+    seen_hashes = {}
+    file_paths = list_resume_files(directory)
+    print(f"📂 Parsing {len(file_paths)} resumes from {directory}...")
+    with ProcessPoolExecutor(max_workers=max_workers or BATCH_PARSE_WORKERS) as pool:
+        futures = {pool.submit(parse_with_stats, path): path for path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            file_name = os.path.basename(file_path)
+            try:
+                parsed_data, time_stats = future.result()
+            except Exception as e:
+                manifest["failed"].append({"file_name": file_name, "stage": "parse", "error": str(e)})
+                continue
+
+            hashes = {"content_hash": hash_file(file_path), "text_hash": text_hash(parsed_data)}
+            if DEDUP_MODE != "off":
+                existing = find_duplicate(get_collection(), **hashes)
+                if existing is not None:
+                    manifest["skipped"].append({"file_name": file_name, "duplicate_of": str(existing["_id"])})
+                    continue
+                # Not stored yet, but already queued earlier in this run.
+                first = seen_hashes.get(hashes["content_hash"]) or seen_hashes.get(hashes["text_hash"])
+                if first is not None:
+                    manifest["skipped"].append({"file_name": file_name, "duplicate_of_unique_id": first})
+                    continue
+
+            unique_id = generate_unique_id(file_path)
+            seen_hashes.update(dict.fromkeys(hashes.values(), unique_id))
+            requests.append(build_request(unique_id, compact_input(parsed_data, time_stats)))
+            manifest["entries"][unique_id] = {
+                "file_path": file_path,
+                "file_name": file_name,
+                "hashes": hashes,
+                "time_stats": time_stats,
+            }
+
+    for i in range(0, len(requests), BULK_MAX_REQUESTS):
+        chunk = requests[i:i + BULK_MAX_REQUESTS]
+        input_path = os.path.join(run_dir, f"requests_{i // BULK_MAX_REQUESTS:03d}.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            for request in chunk:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        manifest["batches"].append({
+            "input_path": input_path,
+            "unique_ids": [request["custom_id"] for request in chunk],
+            "batch_id": None,
+            "status": None,
+            "ingested": False,
+        })
+
+    save_manifest(manifest)
+    print(
+        f"📝 {len(requests)} requests in {len(manifest['batches'])} file(s); "
+        f"{len(manifest['skipped'])} duplicates skipped, {len(manifest['failed'])} failed to parse."
+    )
+    return manifest
+
+
+#Submit & Poll
+def submit_batches(manifest, backend):
+    for batch in manifest["batches"]:
+        if batch["batch_id"]:
+            continue
+        batch["input_file_id"] = backend.upload(batch["input_path"])
+        batch["batch_id"] = backend.create(batch["input_file_id"], metadata={"source": "bulk_extract"})
+        batch["status"] = "validating"
+        print(f"🚀 Submitted {batch['input_path']} as batch {batch['batch_id']}.")
+        save_manifest(manifest)
+
+def poll_batches(manifest, backend, interval=BULK_POLL_INTERVAL):
+    """
+    Poll every submitted batch until all of them reach a terminal status.
+    """
+    while True:
+        pending = [b for b in manifest["batches"] if b["batch_id"] and b["status"] not in TERMINAL_STATUSES]
+        for batch in pending:
+            batch.update(backend.retrieve(batch["batch_id"]))
+            print(f"⏳ Batch {batch['batch_id']}: {batch['status']} {batch.get('request_counts') or ''}")
+        save_manifest(manifest)
+        if not any(b["status"] not in TERMINAL_STATUSES for b in manifest["batches"] if b["batch_id"]):
+            return
+        time.sleep(interval)
+
+
+#Ingest
+def _parse_result_line(line):
+    """
+    Return (unique_id, llm_output, usage) for one Batch API output line;
+    raises ValueError when the request did not produce a usable result.
+    """
+    result = json.loads(line)
+    unique_id = result["custom_id"]
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        raise ValueError(f"{unique_id}: {result.get('error') or response.get('body')}")
+    body = response["body"]
+    choice = body["choices"][0]
+    if choice.get("finish_reason") == "length":
+        raise ValueError(f"{unique_id}: output hit the token limit")
+    if choice["message"].get("refusal"):
+        raise ValueError(f"{unique_id}: refused: {choice['message']['refusal']}")
+    resume = ResumeSchema.model_validate_json(choice["message"]["content"])
+    return unique_id, to_llm_output(resume), body.get("usage") or {}
+
+def ingest_results(manifest, backend):
+    """
+    Download finished batches' output and store one document per resume,
+    keyed by unique_id. Resumes already stored (e.g. from an earlier,
+    interrupted ingest) are skipped. Returns the number of stored documents.
+    """
+    collection = get_collection()
+    stored = 0
+    for batch in manifest["batches"]:
+        # Expired/cancelled batches can still carry output for the requests that
+        # finished; requests without any result are recorded as failures.
+        if batch["ingested"] or batch["status"] not in TERMINAL_STATUSES:
+            continue
+
+        lines = []
+        for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+            if file_id:
+                lines.extend(line for line in backend.download(file_id).splitlines() if line.strip())
+
+        results = []
+        answered = set()
+        for line in lines:
+            try:
+                answered.add(json.loads(line).get("custom_id"))
+                results.append(_parse_result_line(line))
+            except (ValueError, KeyError) as e:
+                manifest["failed"].append({"stage": "llm", "batch_id": batch["batch_id"], "error": str(e)})
+
+        ids = [unique_id for unique_id, _, _ in results]
+        for unique_id in set(batch["unique_ids"]) - answered:
+            manifest["failed"].append({"stage": "llm", "unique_id": unique_id, "error": f"no result ({batch['status']})"})
+        existing = {doc["unique_id"] for doc in collection.find({"unique_id": {"$in": ids}}, {"unique_id": 1})}
+
+        futures = []
+        for unique_id, llm_output, usage in results:
+            entry = manifest["entries"].get(unique_id)
+            if entry is None or unique_id in existing:
+                continue
+            time_stats = dict(entry["time_stats"], extraction_mode="batch", batch_id=batch["batch_id"])
+            record_llm_usage(
+                {key: usage.get(key, 0) for key in ("prompt_tokens", "completion_tokens", "total_tokens")},
+                0.0, "batch", time_stats
+            )
+            futures.append((unique_id, store_in_mongo_buffered(
+                unique_id, entry["file_name"], None, llm_output, time_stats, entry["hashes"]
+            )))
+        for unique_id, future in futures:
+            try:
+                future.result()
+                stored += 1
+            except Exception as e:
+                manifest["failed"].append({"stage": "store", "unique_id": unique_id, "error": str(e)})
+
+        batch["ingested"] = True
+        save_manifest(manifest)
+        print(f"✅ Ingested batch {batch['batch_id']}: {len(futures)} stored, {len(existing)} already present.")
+    return stored
+
+
+#Entry Points
+def run_bulk(directory, backend, out_dir=BULK_OUTPUT_DIR, interval=BULK_POLL_INTERVAL):
+    manifest = prepare_bulk(directory, out_dir)
+    return resume_bulk(manifest, backend, interval)
+
+def resume_bulk(manifest, backend, interval=BULK_POLL_INTERVAL):
+    """
+    Continue a bulk run from its manifest: submit what was not submitted,
+    poll, and ingest what was not ingested. Safe to re-run after a crash.
+    """
+    submit_batches(manifest, backend)
+    poll_batches(manifest, backend, interval)
+    ingest_results(manifest, backend)
+    print(f"📋 Manifest: {manifest['manifest_path']} ({len(manifest['failed'])} failure(s))")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-extract a directory of resumes through the Batch API.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Parse, submit, poll and ingest a directory.")
+    run_parser.add_argument("directory")
+    run_parser.add_argument("--out", default=BULK_OUTPUT_DIR)
+    prepare_parser = subparsers.add_parser("prepare", help="Only parse and write the request JSONL.")
+    prepare_parser.add_argument("directory")
+    prepare_parser.add_argument("--out", default=BULK_OUTPUT_DIR)
+    resume_parser = subparsers.add_parser("resume", help="Continue a run from its manifest.json.")
+    resume_parser.add_argument("manifest")
+    for sub in (run_parser, resume_parser):
+        sub.add_argument("--backend", default="openai")
+        sub.add_argument("--interval", type=float, default=BULK_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    if args.command == "prepare":
+        prepare_bulk(args.directory, args.out)
+        sys.exit(0)
+    backend = get_batch_backend(args.backend)
+    if args.command == "run":
+        manifest = run_bulk(args.directory, backend, args.out, args.interval)
+    else:
+        manifest = resume_bulk(load_manifest(args.manifest), backend, args.interval)
+    sys.exit(1 if manifest["failed"] else 0)
@@ -0,0 +1,164 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+# Number of converters kept per input format. Each converter holds its own
+# copy of the layout/table models, so keep this small.
+POOL_SIZE = int(os.getenv("DOCLING_POOL_SIZE", "1"))
+
+# kind -> docling InputFormat member name. docling itself is imported lazily
+# so that importing this module (e.g. from app.py) stays cheap.
+FORMATS = {
+    "pdf": "PDF",
+    "docx": "DOCX",
+}
+
+# Between pages of the exported markdown; the same rule pymupdf4llm writes,
+# so utils/compact.py can tell page headers/footers from body lines.
+PAGE_SEPARATOR = "\n\n-----\n\n"
+
+_lock = threading.Lock()
+_idle = {kind: queue.Queue() for kind in FORMATS}
+_created = {kind: 0 for kind in FORMATS}
+_warm_thread = None
+
+# kind -> list of model-load durations in seconds, one per converter built
+load_times = {kind: [] for kind in FORMATS}
+
+
+def _build_converter(kind):
+    start = time.time()
+    from docling.document_converter import DocumentConverter
+    from docling.datamodel.base_models import InputFormat
+    converter = DocumentConverter()
+    # Load the pipeline (and its models) now rather than on first convert(),
+    # so model-load time is measured separately from conversion time.
+    converter.initialize_pipeline(InputFormat[FORMATS[kind]])
+    elapsed = time.time() - start
+    load_times[kind].append(elapsed)
+    print(f"🧠 Docling {kind} converter loaded in {elapsed:.2f} seconds.")
+    return converter, elapsed
+
+
+def _reserve_slot(kind):
+    with _lock:
+        if _created[kind] < POOL_SIZE:
+            _created[kind] += 1
+            return True
+        return False
+
+
+def _release_slot(kind):
+    with _lock:
+        _created[kind] -= 1
+
+
+@contextmanager
+def borrow_converter(kind, time_stats=None):
+    """
+    Hand out a warm DocumentConverter for the given kind ("pdf" or "docx").
+    A converter is used by one caller at a time and returned to the pool on exit.
+    If time_stats is given, the model-load time paid by this call is recorded
+    as docling_load_time (0 when a warm converter was reused), and any time
+    spent waiting for a busy or still-warming converter as docling_wait_time.
+    """
+    load_time = 0.0
+    wait_start = time.time()
+    timeout = None
+    while True:
+        try:
+            converter = _idle[kind].get(timeout=timeout) if timeout else _idle[kind].get_nowait()
+            break
+        except queue.Empty:
+            pass
+        if _reserve_slot(kind):
+            try:
+                converter, load_time = _build_converter(kind)
+            except Exception:
+                _release_slot(kind)
+                raise
+            break
+        # Pool is full (or still warming up): wait for a converter to come back,
+        # re-checking periodically in case a warm-up build failed.
+        timeout = 1.0
+    wait_time = time.time() - wait_start - load_time
+
+    if time_stats is not None:
+        time_stats["docling_load_time"] = load_time
+        time_stats["docling_wait_time"] = wait_time
+    try:
+        yield converter
+    finally:
+        _idle[kind].put(converter)
+
+
+def export_markdown(document):
+    """
+    Markdown of a docling document, page by page joined with PAGE_SEPARATOR
+    (export_to_markdown() itself marks no page boundaries). Documents
+    without page information (e.g. some DOCX) are exported in one piece.
+    """
+    if not document.pages:
+        return document.export_to_markdown()
+    return PAGE_SEPARATOR.join(document.export_to_markdown(page_no=page_no) for page_no in sorted(document.pages))
+
+
+def convert_to_markdown(kind, path, time_stats=None):
+    """
+    Convert a document with a pooled converter and return its markdown.
+    Conversion time is recorded separately as docling_convert_time.
+    """
+    with borrow_converter(kind, time_stats) as converter:
+        convert_start = time.time()
+        result = converter.convert(path)
+        parsed_data = export_markdown(result.document)
+    if time_stats is not None:
+        time_stats["docling_convert_time"] = time.time() - convert_start
+    return parsed_data
+
+
+def _warm(kinds):
+    for kind in kinds:
+        if not _reserve_slot(kind):
+            continue
+        try:
+            converter, _ = _build_converter(kind)
+        except Exception as e:
+            _release_slot(kind)
+            print(f"⚠️ Failed to preload docling {kind} converter: {e}")
+            continue
+        _idle[kind].put(converter)
+
+
+def warm_converters(kinds=("pdf", "docx"), background=True):
+    """
+    Build one converter per kind ahead of the first request.
+    Safe to call repeatedly (e.g. on every Streamlit rerun); only the first
+    call does any work.
+    """
+    global _warm_thread
+    with _lock:
+        if _warm_thread is not None:
+            return _warm_thread
+        _warm_thread = threading.Thread(target=_warm, args=(tuple(kinds),), daemon=True, name="docling-warmup")
+    if background:
+        _warm_thread.start()
+    else:
+        _warm_thread.run()
+    return _warm_thread
+
+
+def pool_stats():
+    """
+    Return per-kind counts of built and idle converters and their load times.
+    """
+    return {
+        kind: {
+            "created": _created[kind],
+            "idle": _idle[kind].qsize(),
+            "load_times": list(load_times[kind]),
+        }
+        for kind in FORMATS
+    }
@@ -1,6 +1,76 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pymupdf
 import pymupdf4llm
 
-def extract_text_and_tables(pdf_path):
-    md_text = pymupdf4llm.to_markdown(pdf_path)
+# Convert PDFs with at least this many pages in parallel chunks of pages;
+# 0 turns page-parallel extraction off.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PDF_PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "4"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """
+    One process pool per process, created on first use and reused so each
+    large PDF doesn't pay for starting workers and importing pymupdf.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS)
+        return _pool
+
+
+def page_chunks(page_count, pages_per_chunk=PDF_PAGES_PER_CHUNK):
+    """
+    Split 0..page_count-1 into contiguous page lists, in page order.
+    """
+    pages_per_chunk = max(1, pages_per_chunk)
+    return [list(range(start, min(start + pages_per_chunk, page_count)))
+            for start in range(0, page_count, pages_per_chunk)]
+
+
+def _chunk_to_markdown(pdf_path, pages, hdr_info):
+    return pymupdf4llm.to_markdown(pdf_path, pages=pages, hdr_info=hdr_info, show_progress=False)
+
+
+def extract_text_and_tables(pdf_path, workers=None):
+    """
+    Markdown of the whole PDF. Large PDFs are converted in chunks of pages
+    on worker processes and joined in page order.
+
+    pymupdf4llm renders each page independently (tables are detected per
+    page) and concatenates the pages, so splitting on page boundaries gives
+    the same markdown as a single call, including tables that continue on
+    the next page. Only the heading levels depend on the whole document;
+    they are computed once here and passed to every chunk.
+    """
+    workers = PDF_PAGE_WORKERS if workers is None else workers
+    with pymupdf.open(pdf_path) as doc:
+        page_count = doc.page_count
+        parallel = (
+            PDF_PARALLEL_MIN_PAGES > 0
+            and page_count >= PDF_PARALLEL_MIN_PAGES
+            and workers > 1
+            # Batch parsing already runs one PDF per worker process.
+            and multiprocessing.parent_process() is None
+        )
+        if not parallel:
+            return pymupdf4llm.to_markdown(doc)
+        hdr_info = pymupdf4llm.IdentifyHeaders(doc)
 
-    return md_text
\ No newline at end of file
+    chunks = page_chunks(page_count, min(PDF_PAGES_PER_CHUNK, -(-page_count // workers)))
+    pool = _get_pool() if workers == PDF_PAGE_WORKERS else ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(_chunk_to_markdown, pdf_path, pages, hdr_info) for pages in chunks]
+        return "".join(future.result() for future in futures)
+    finally:
+        if pool is not _pool:
+            pool.shutdown()
@@ -1,13 +1,10 @@
 import subprocess
 import os
-from docling.document_converter import DocumentConverter
+from knowledge.converter_pool import convert_to_markdown
 
-def extract_text_docx_file(path):
-    
-    converter = DocumentConverter()
-    result = converter.convert(path)
-    parsed_data = result.document.export_to_markdown()
-    return parsed_data
+def extract_text_docx_file(path, time_stats=None):
+
+    return convert_to_markdown("docx", path, time_stats)
 
 def extract_text_from_doc(doc_path): 
     if not os.path.exists(doc_path):
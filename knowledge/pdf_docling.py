@@ -1,11 +1,8 @@
-from docling.document_converter import DocumentConverter
+from knowledge.converter_pool import convert_to_markdown
 
-def extract_text_and_tables(pdf_path):
-    
-    converter = DocumentConverter()
-    result = converter.convert(pdf_path)
-    parsed_data = result.document.export_to_markdown()
-    return parsed_data
+def extract_text_and_tables(pdf_path, time_stats=None):
+
+    return convert_to_markdown("pdf", pdf_path, time_stats)
 
 
 # path = "/Users/Apple/Desktop/Givery BP/Givery-Resume-Parsing/data/JP resume format 002.pdf"
@@ -0,0 +1,99 @@
+import os
+import time
+
+import pymupdf
+
+# Pages sampled per PDF (evenly spread); the inspection must stay far
+# cheaper than the extraction it routes.
+PDF_INSPECT_MAX_PAGES = int(os.getenv("PDF_INSPECT_MAX_PAGES", "12"))
+# A page with fewer extractable characters than this has no usable text layer.
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "50"))
+# Axis-aligned ruling lines (table borders) that make a page "table-like".
+PDF_TABLE_RULINGS = int(os.getenv("PDF_TABLE_RULINGS", "20"))
+# Route to docling when more than this fraction of sampled pages is ...
+PDF_MAX_IMAGE_ONLY_RATIO = float(os.getenv("PDF_MAX_IMAGE_ONLY_RATIO", "0.2"))  # ... image-only
+PDF_MAX_TABLE_RATIO = float(os.getenv("PDF_MAX_TABLE_RATIO", "0.5"))  # ... table-like
+
+
+def sample_pages(page_count, max_pages=PDF_INSPECT_MAX_PAGES):
+    if page_count <= max_pages:
+        return list(range(page_count))
+    step = page_count / max_pages
+    return sorted({int(i * step) for i in range(max_pages)})
+
+
+def _ruling_count(page):
+    """
+    Horizontal/vertical line segments and thin rectangles in the page's
+    vector graphics, i.e. what table detection keys on.
+    """
+    count = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.x - p2.x) < 1 or abs(p1.y - p2.y) < 1:
+                    count += 1
+            elif item[0] == "re":
+                rect = item[1]
+                # Cell borders drawn as hairline rectangles count once, boxes as four sides.
+                count += 1 if min(rect.width, rect.height) < 2 else 4
+    return count
+
+
+def inspect_pdf(pdf_path):
+    """
+    Cheap per-page statistics of a PDF: text layer, image-only pages and
+    table-like pages over a sample of pages. No layout model is involved.
+    """
+    start = time.time()
+    with pymupdf.open(pdf_path) as doc:
+        pages = sample_pages(doc.page_count)
+        text_pages = image_only_pages = table_pages = text_chars = 0
+        for pno in pages:
+            page = doc.load_page(pno)
+            chars = len(page.get_text("text").strip())
+            text_chars += chars
+            if chars >= PDF_MIN_TEXT_CHARS:
+                text_pages += 1
+            elif page.get_images(full=False):
+                image_only_pages += 1
+            if _ruling_count(page) >= PDF_TABLE_RULINGS:
+                table_pages += 1
+        page_count = doc.page_count
+    sampled = len(pages) or 1
+    return {
+        "page_count": page_count,
+        "sampled_pages": len(pages),
+        "text_pages": text_pages,
+        "image_only_pages": image_only_pages,
+        "table_pages": table_pages,
+        "text_layer_ratio": text_pages / sampled,
+        "image_only_ratio": image_only_pages / sampled,
+        "table_density": table_pages / sampled,
+        "chars_per_page": text_chars / sampled,
+        "inspect_time": time.time() - start,
+    }
+
+
+def choose_pdf_engine(inspection):
+    """
+    ("pymupdf4llm" | "docling", reason). Text-native PDFs go to the fast
+    engine; scanned or table-heavy ones need docling's OCR / layout models.
+    """
+    if inspection["page_count"] == 0 or inspection["text_pages"] == 0:
+        return "docling", "no text layer"
+    if inspection["image_only_ratio"] > PDF_MAX_IMAGE_ONLY_RATIO:
+        return "docling", f"{inspection['image_only_pages']} image-only page(s)"
+    if inspection["table_density"] > PDF_MAX_TABLE_RATIO:
+        return "docling", f"table-heavy ({inspection['table_pages']}/{inspection['sampled_pages']} pages)"
+    return "pymupdf4llm", "text layer"
+
+
+def route_pdf(pdf_path):
+    """
+    Inspect pdf_path and return (engine, reason, inspection).
+    """
+    inspection = inspect_pdf(pdf_path)
+    engine, reason = choose_pdf_engine(inspection)
+    return engine, reason, inspection
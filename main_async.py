@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import weakref
+from types import SimpleNamespace
+from openai import AsyncOpenAI
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.mongo_client import MONGODB_URI, MONGO_DB_NAME, MONGO_COLLECTION_NAME, client_options
+from main_final import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    LLM_CACHE_DISABLED,
+    DEDUP_MODE,
+    RESUME_EXTRACTION_PROMPT,
+    ResumeSchema,
+    llm_cache,
+    llm_cache_key,
+    parse_with_stats,
+    generate_unique_id,
+    build_resume_document,
+    compact_input,
+    record_llm_usage,
+    record_resume_outcome,
+    resolve_duplicate,
+)
+from utils.disk_cache import hash_file
+from utils.dedup import text_hash, duplicate_filter, DUPLICATE_SORT
+from utils import metrics
+from utils.metrics import new_trace_id, timer
+
+ASYNC_MAX_LLM_CALLS = int(os.getenv("ASYNC_MAX_LLM_CALLS", "16"))
+ASYNC_MAX_DB_WRITES = int(os.getenv("ASYNC_MAX_DB_WRITES", "8"))
+
+# Async clients and semaphores are bound to the event loop that created them,
+# so keep one set per running loop.
+_loop_state = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        mongo_client = AsyncIOMotorClient(MONGODB_URI, **client_options())
+        state = SimpleNamespace(
+            openai=AsyncOpenAI(api_key=OPENAI_API_KEY),
+            collection=mongo_client[MONGO_DB_NAME][MONGO_COLLECTION_NAME],
+            llm_semaphore=asyncio.Semaphore(ASYNC_MAX_LLM_CALLS),
+            db_semaphore=asyncio.Semaphore(ASYNC_MAX_DB_WRITES),
+        )
+        _loop_state[loop] = state
+    return state
+
+
+#Calling OpenAI API (async)
+async def call_openai_async(prompt, parsed_data, time_stats=None, use_cache=True):
+    """
+    Async counterpart of main_final.call_openai(), sharing its response cache.
+    At most ASYNC_MAX_LLM_CALLS requests are in flight per event loop.
+    The SQLite cache is read and written from a worker thread.
+    """
+    state = _state()
+    use_cache = use_cache and not LLM_CACHE_DISABLED
+    # Always the real OpenAI API here, whatever LLM_BACKEND says; keep mock
+    # and real responses apart in the shared cache.
+    cache_key = llm_cache_key(prompt, parsed_data, backend="openai")
+    if use_cache:
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if time_stats is not None:
+            time_stats["llm_cache_hit"] = cached is not None
+            time_stats["llm_cache_hits"] = llm_cache.hits
+            time_stats["llm_cache_misses"] = llm_cache.misses
+        if cached is not None:
+            return cached
+
+    queue_start = time.time()
+    async with state.llm_semaphore:
+        metrics.LLM_QUEUE_SECONDS.observe(time.time() - queue_start)
+        if time_stats is not None:
+            time_stats["llm_queue_time"] = time.time() - queue_start
+        generation_stats = {}
+        with timer(metrics.LLM_GENERATION_SECONDS, generation_stats, "seconds", backend="openai-async", schema="ResumeSchema"):
+            completion = await state.openai.beta.chat.completions.parse(
+                temperature=OPENAI_TEMPERATURE,
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": str(prompt)},
+                    {"role": "user", "content": str(parsed_data)}
+                ],
+                response_format=ResumeSchema,
+            )
+    response = completion.choices[0].message.model_dump_json(exclude_none=True)
+    record_llm_usage(completion.usage.model_dump(), generation_stats["seconds"], "openai-async", time_stats)
+    if use_cache:
+        await asyncio.to_thread(llm_cache.set, cache_key, response)
+    return response
+
+
+#Dedup (async)
+async def find_duplicate_async(time_stats, content_hash=None, text_hash=None):
+    """
+    Async counterpart of utils.dedup.find_duplicate(), same filter and sort.
+    """
+    query = duplicate_filter(content_hash, text_hash)
+    if query is None:
+        return None
+    with timer(metrics.STAGE_SECONDS, time_stats, "dedup_time", stage="dedup"):
+        return await _state().collection.find_one(query, sort=DUPLICATE_SORT)
+
+
+#Store in MongoDB (async)
+async def store_in_mongo_async(unique_id, file_name, llm_output, time_stats, extra_fields=None):
+    """
+    Insert a record with the async driver.
+    At most ASYNC_MAX_DB_WRITES inserts are in flight per event loop.
+    """
+    state = _state()
+    doc = build_resume_document(unique_id, file_name, llm_output, time_stats, extra_fields)
+    async with state.db_semaphore:
+        with timer(metrics.DB_WRITE_SECONDS, op="insert_one_async"):
+            result = await state.collection.insert_one(doc)
+    print(f"Inserted document with _id: {result.inserted_id}")
+    return result.inserted_id
+
+
+def _write_output(output_file, parsed_json):
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(parsed_json.get("parsed"), f, ensure_ascii=False, indent=4)
+
+
+#Main Function (async)
+async def process_resume_async(file_path, original_filename, executor=None, dedup=None):
+    """
+    Async counterpart of main_final.process_resume(), including its dedup
+    lookups (by file bytes before parsing, by parsed text before the LLM).
+    Parsing runs in executor (default: the loop's thread pool; pass a
+    ProcessPoolExecutor for CPU-heavy batches); the LLM call and DB
+    reads/writes are awaited without blocking a thread. Other blocking steps
+    (hashing, tokenizer, file writes) run in worker threads so they don't
+    stall the event loop.
+    """
+    dedup = dedup or DEDUP_MODE
+    loop = asyncio.get_running_loop()
+    total_start = time.time()
+    unique_id = generate_unique_id(file_path)
+    output_file = f"final_output_{unique_id}.json"
+    # Each gathered coroutine runs in its own task context, so traces don't mix.
+    trace_id = new_trace_id()
+
+    dedup_stats = {}
+    with timer(metrics.STAGE_SECONDS, dedup_stats, "read_time", stage="read"):
+        hashes = {"content_hash": await asyncio.to_thread(hash_file, file_path)}
+    existing = None
+    if dedup != "off":
+        existing = await find_duplicate_async(dedup_stats, content_hash=hashes["content_hash"])
+
+    parsed_data, time_stats = None, {}
+    if existing is None:
+        with timer(metrics.STAGE_SECONDS, stage="parse"):
+            parsed_data, time_stats = await loop.run_in_executor(
+                executor, parse_with_stats, file_path, hashes["content_hash"]
+            )
+        hashes["text_hash"] = await asyncio.to_thread(text_hash, parsed_data)
+        if dedup != "off":
+            existing = await find_duplicate_async(dedup_stats, text_hash=hashes["text_hash"])
+    time_stats.update(dedup_stats)
+    time_stats["trace_id"] = trace_id
+
+    if existing is not None:
+        time_stats["total_time"] = time.time() - total_start
+        # resolve_duplicate() stores through a synchronous callback; collect
+        # the insert (dedup="link") and run it with the async driver instead.
+        pending = []
+        def store(*args):
+            pending.append(args)
+            return args[-1]["_id"]
+        result = resolve_duplicate(existing, unique_id, original_filename, parsed_data, time_stats, hashes, dedup, store)
+        for link_id, file_name, _, link_output, link_stats, extra_fields in pending:
+            await store_in_mongo_async(link_id, file_name, link_output, link_stats, extra_fields)
+        record_resume_outcome(result)
+        return result
+
+    inference_start = time.time()
+    # compact_input() runs tiktoken, whose first use may download its BPE file.
+    llm_input = await asyncio.to_thread(compact_input, parsed_data, time_stats)
+    llm_output = await call_openai_async(RESUME_EXTRACTION_PROMPT, llm_input, time_stats)
+    time_stats["total_inference_time"] = time.time() - inference_start
+
+    await asyncio.to_thread(_write_output, output_file, json.loads(llm_output))
+    time_stats["total_time"] = time.time() - total_start
+
+    inserted_id = await store_in_mongo_async(unique_id, original_filename, llm_output, time_stats, hashes)
+
+    result = {
+        "inserted_id": inserted_id,
+        "unique_id": unique_id,
+        "time_stats": time_stats,
+        "parsed_data": parsed_data,
+        "llm_output": llm_output
+    }
+    record_resume_outcome(result)
+    return result
+
+
+async def process_resumes_async(file_paths, original_filenames=None, executor=None, dedup=None):
+    """
+    Run process_resume_async() for many files concurrently.
+    Returns per-file result dicts in input order; failures carry "error".
+    """
+    file_paths = list(file_paths)
+    if original_filenames is None:
+        original_filenames = [os.path.basename(path) for path in file_paths]
+    results = await asyncio.gather(
+        *(process_resume_async(path, name, executor, dedup) for path, name in zip(file_paths, original_filenames)),
+        return_exceptions=True
+    )
+    output = []
+    for path, name, result in zip(file_paths, original_filenames, results):
+        entry = {"file_path": path, "file_name": name}
+        if isinstance(result, BaseException):
+            entry["error"] = str(result)
+        else:
+            entry.update(result)
+        output.append(entry)
+    return output
+
+
+if __name__ == "__main__":
+    for result in asyncio.run(process_resumes_async(sys.argv[1:])):
+        print(result.get("file_name"), result.get("unique_id") or f"ERROR: {result['error']}")
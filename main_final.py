@@ -1,162 +1,811 @@
 import os
 import json
 import time
-import certifi
+import queue
+import threading
+import hashlib
+import importlib
+import contextvars
+from importlib import metadata
+from bson import ObjectId
 from dotenv import load_dotenv
-from openai import OpenAI
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from utils.jp_schema import ResumeSchema
-from knowledge.pdf_docling import extract_text_and_tables
-from knowledge.parse_excel import extract_excel_to_markdown
-from knowledge.parsedoc import extract_text_docx_file, extract_text_from_doc
 from prompt.test1 import RESUME_EXTRACTION_PROMPT
+from utils.disk_cache import DiskCache, hash_file
+from utils.mongo_writer import BulkWriter
+from utils.mongo_indexes import ensure_indexes
+from utils.mongo_client import get_collection
+from utils.dedup import text_hash, find_duplicate
+from utils.compact import compact_text, count_tokens
+from utils.retry import CircuitBreaker, retry_call, classify_error
+from utils.llm_backend import LLM_BACKEND, create_backend
+from utils import metrics
+from utils.metrics import timer, new_trace_id, current_trace_id
+from utils.sections import (
+    SECTION_GROUPS,
+    SECTION_SCHEMAS,
+    WORK_HISTORY_SECTION,
+    section_instruction,
+    split_projects,
+    chunk_segments,
+    merge_sections,
+    to_llm_output,
+)
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-MONGODB_URI = os.getenv("MONGODB_URI")
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", ".cache")
+PARSE_CACHE_MAX_MB = int(os.getenv("PARSE_CACHE_MAX_MB", "512"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+BATCH_PARSE_WORKERS = int(os.getenv("BATCH_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "8"))
+MONGO_BULK_BATCH_SIZE = int(os.getenv("MONGO_BULK_BATCH_SIZE", "50"))
+MONGO_BULK_FLUSH_INTERVAL = float(os.getenv("MONGO_BULK_FLUSH_INTERVAL", "0.5"))
+# What to do when a resume matches a stored one by file bytes or normalized text:
+# "return" the stored result, "link" a new document to it, or "off".
+DEDUP_MODE = os.getenv("DEDUP_MODE", "return")
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+COMPACT_INPUT = os.getenv("COMPACT_INPUT", "1").lower() in ("1", "true", "yes")
+# "auto" inspects each PDF to pick an engine; "docling" or "pymupdf4llm" forces one.
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto")
+# "single" (one ResumeSchema call), "sections" (parallel per-section calls)
+# or "auto" (sections once the input exceeds SECTION_FANOUT_MIN_TOKENS).
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "auto")
+SECTION_FANOUT_MIN_TOKENS = int(os.getenv("SECTION_FANOUT_MIN_TOKENS", "6000"))
+SECTION_FANOUT_WORKERS = int(os.getenv("SECTION_FANOUT_WORKERS", "8"))
+WORK_HISTORY_CHUNK_TOKENS = int(os.getenv("WORK_HISTORY_CHUNK_TOKENS", "4000"))
+# Stage retries (see utils.retry); the OpenAI client's own retries are off so
+# that this is the only retry policy.
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
 
-# MongoDB Connection
-client = MongoClient(
-        MONGODB_URI, 
-        tlsCAFile=certifi.where(),  
-        serverSelectionTimeoutMS=5000
-    )
-db = client["resume_db"]
-collection = db["resumes"]
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.35"))
 
 #Helper/Decorator
 def log_time(func):
+    """
+    Record the function's duration in the resume_function_seconds histogram
+    (see utils.metrics).
+    """
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        print(f"⏱️ {func.__name__} executed in {end_time - start_time:.2f} seconds.")
-        return result
+        with timer(metrics.FUNCTION_SECONDS, function=func.__name__):
+            return func(*args, **kwargs)
     return wrapper
 
+#Parse Cache
+parse_cache = DiskCache(
+    os.path.join(PARSE_CACHE_DIR, "parse_cache.sqlite3"),
+    max_bytes=PARSE_CACHE_MAX_MB * 1024 * 1024
+)
+
+# extension -> (extractor name, package whose version is part of the cache key, module, function)
+# Extractor modules pull in heavy stacks (docling, pymupdf4llm, pandas), so each
+# one is imported only when its extension is first dispatched in parse_file.
+EXTRACTORS = {
+    ".pdf": ("docling", "docling", "knowledge.pdf_docling", "extract_text_and_tables"),
+    ".doc": ("antiword", None, "knowledge.parsedoc", "extract_text_from_doc"),
+    ".docx": ("docling", "docling", "knowledge.parsedoc", "extract_text_docx_file"),
+    ".xlsx": ("pandas+tabulate", "tabulate", "knowledge.parse_excel", "extract_excel_to_markdown"),
+}
+
+# PDF engine -> extractor entry; see select_pdf_extractor.
+PDF_ENGINES = {
+    "docling": EXTRACTORS[".pdf"],
+    "pymupdf4llm": ("pymupdf4llm", "pymupdf4llm", "knowledge.parse_pdf", "extract_text_and_tables"),
+}
+
+# module name -> seconds spent importing it on first dispatch
+IMPORT_TIMES = {}
+
+def load_extractor(module_name, function_name, time_stats=None):
+    """
+    Import an extractor module on first use and return the extractor function.
+    The first import's duration is kept in IMPORT_TIMES and, if time_stats is
+    given, recorded as extractor_import_time.
+    """
+    if module_name not in IMPORT_TIMES:
+        import_start = time.time()
+        importlib.import_module(module_name)
+        IMPORT_TIMES[module_name] = time.time() - import_start
+        metrics.EXTRACTOR_IMPORT_SECONDS.observe(IMPORT_TIMES[module_name], module=module_name)
+        print(f"📦 Imported {module_name} in {IMPORT_TIMES[module_name]:.2f} seconds.")
+        if time_stats is not None:
+            time_stats["extractor_import_time"] = IMPORT_TIMES[module_name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def extractor_version(package):
+    if package is None:
+        return "system"
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def _run_extractor(extractor_name, extract, file_path, time_stats):
+    with timer(metrics.PARSE_SECONDS, time_stats, "extract_time", extractor=extractor_name):
+        # Docling extractors report model-load vs conversion time into time_stats.
+        if extractor_name == "docling":
+            return extract(file_path, time_stats)
+        return extract(file_path)
+
+# content hash -> JSON of its PDF inspection, so a re-parsed PDF (e.g. a
+# parse-cache hit) isn't reopened just to pick the same engine again.
+pdf_route_cache = DiskCache(os.path.join(PARSE_CACHE_DIR, "pdf_route_cache.sqlite3"), max_bytes=16 * 1024 * 1024)
+
+def select_pdf_extractor(file_path, time_stats=None, content_hash=None):
+    """
+    Pick the PDF extractor according to PDF_ENGINE. In auto mode a quick
+    inspection (text layer, image-only pages, table density, page count)
+    sends text-native PDFs to pymupdf4llm and scanned or table-heavy ones
+    to docling. With content_hash, the inspection is cached by it (the
+    engine is still chosen from it, so threshold changes apply). The
+    decision is recorded in time_stats.
+    """
+    if PDF_ENGINE != "auto":
+        engine, reason, inspection = PDF_ENGINE, "PDF_ENGINE", None
+    else:
+        try:
+            choose_pdf_engine = load_extractor("knowledge.pdf_inspect", "choose_pdf_engine")
+            cached = pdf_route_cache.get(f"pdf_route:{content_hash}") if content_hash else None
+            if cached is not None:
+                inspection = dict(json.loads(cached), inspect_time=0.0)
+            else:
+                inspection = load_extractor("knowledge.pdf_inspect", "inspect_pdf")(file_path)
+                if content_hash:
+                    pdf_route_cache.set(f"pdf_route:{content_hash}", json.dumps(inspection))
+            if time_stats is not None:
+                time_stats["pdf_route_cache_hit"] = cached is not None
+            engine, reason = choose_pdf_engine(inspection)
+        except Exception as e:
+            # Unreadable for pymupdf: let docling try (and report the real error).
+            engine, reason, inspection = "docling", f"inspection failed: {type(e).__name__}: {e}", None
+    if engine not in PDF_ENGINES:
+        raise ValueError(f"Unknown PDF engine: {engine}")
+    metrics.PDF_ROUTES.inc(engine=engine)
+    if time_stats is not None:
+        time_stats["pdf_engine"] = engine
+        time_stats["pdf_engine_reason"] = reason
+        if inspection is not None:
+            inspection = dict(inspection)
+            time_stats["pdf_inspect_time"] = inspection.pop("inspect_time")
+            time_stats["pdf_inspection"] = inspection
+    return PDF_ENGINES[engine]
+
 #Parsing Resume Files
 @log_time
-def parse_file(file_path):
-    """Given a path to a file on disk, parse it according to extension."""
+def parse_file(file_path, time_stats=None, use_cache=True, content_hash=None):
+    """
+    Given a path to a file on disk, parse it according to extension.
+    Results are cached on disk by file content hash + extractor name/version.
+    If time_stats is given, cache hit/miss information is recorded in it.
+    content_hash can be passed when the caller has already hashed the file.
+    """
     file_extension = os.path.splitext(file_path)[1].lower()
-    if file_extension == ".pdf":
-        return extract_text_and_tables(file_path)
-    elif file_extension in [".doc"]:
-        return extract_text_from_doc(file_path)
-    elif file_extension in [".docx"]:
-        return extract_text_docx_file(file_path)
-    elif file_extension == ".xlsx":
-        return extract_excel_to_markdown(file_path)
-    else:
+    if file_extension not in EXTRACTORS:
         raise ValueError(f"Unsupported file type: {file_extension}")
+    extractor_name, package, module_name, function_name = EXTRACTORS[file_extension]
+    if use_cache:
+        content_hash = content_hash or hash_file(file_path)
+    if file_extension == ".pdf":
+        extractor_name, package, module_name, function_name = select_pdf_extractor(file_path, time_stats, content_hash)
+
+    if not use_cache:
+        extract = load_extractor(module_name, function_name, time_stats)
+        return _run_extractor(extractor_name, extract, file_path, time_stats)
+
+    cache_key = f"{content_hash}:{extractor_name}:{extractor_version(package)}"
+    parsed_data = parse_cache.get(cache_key)
+    cache_hit = parsed_data is not None
+    metrics.CACHE_REQUESTS.inc(cache="parse", result="hit" if cache_hit else "miss")
+    if not cache_hit:
+        extract = load_extractor(module_name, function_name, time_stats)
+        parsed_data = _run_extractor(extractor_name, extract, file_path, time_stats)
+        parse_cache.set(cache_key, parsed_data)
+
+    if time_stats is not None:
+        time_stats["parse_cache_hit"] = cache_hit
+        time_stats["parse_cache_hits"] = parse_cache.hits
+        time_stats["parse_cache_misses"] = parse_cache.misses
+    return parsed_data
+
+#LLM Response Cache
+llm_cache = DiskCache(
+    os.path.join(LLM_CACHE_DIR, "llm_cache.sqlite3"),
+    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+    ttl=LLM_CACHE_TTL_HOURS * 3600
+)
+
+def llm_cache_key(prompt, parsed_data, model=OPENAI_MODEL, temperature=OPENAI_TEMPERATURE, schema=ResumeSchema,
+                  backend=LLM_BACKEND):
+    """
+    Hash every input that determines the structured output:
+    system prompt, response schema, model, temperature and the parsed text.
+    Non-OpenAI backends get their own keys so e.g. mock output never
+    answers a real request.
+    """
+    fields = {
+        "prompt": str(prompt),
+        "schema": schema.model_json_schema(),
+        "model": model,
+        "temperature": temperature,
+        "parsed_data": str(parsed_data),
+    }
+    if backend != "openai":
+        fields["backend"] = backend
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+_llm_backend = None
+_llm_backend_lock = threading.Lock()
+
+def get_llm_backend():
+    """
+    Return the process-wide LLM backend selected by LLM_BACKEND (see
+    utils.llm_backend), creating it on first use. Its client, and so its
+    HTTP connection pool, lives for the whole process.
+    """
+    global _llm_backend
+    with _llm_backend_lock:
+        if _llm_backend is None:
+            _llm_backend = create_backend(LLM_BACKEND)
+        return _llm_backend
+
+def set_llm_backend(backend):
+    """
+    Replace the shared backend (e.g. with a MockBackend in benchmarks).
+    Returns the previous one.
+    """
+    global _llm_backend
+    with _llm_backend_lock:
+        previous, _llm_backend = _llm_backend, backend
+    return previous
+
+# Shared by every LLM call in the process, so concurrent requests stop
+# hammering the provider together once it is degraded.
+llm_breaker = CircuitBreaker("LLM", LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
 
 #Calling OpenAI API (ChatCompletions)
-@log_time
-def call_openai(prompt, parsed_data):
-    print("🔮 Calling OpenAI's API...")
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    completion = client.beta.chat.completions.parse(
-        temperature=0.35,
-        model="gpt-4o-2024-08-06",
-        messages=[
-            {"role": "system", "content": str(prompt)},
-            {"role": "user", "content": str(parsed_data)}
-        ],
-        response_format=ResumeSchema,
-    )
-    response = completion.choices[0].message.model_dump_json(exclude_none=True)
+def structured_completion(prompt, parsed_data, response_format=ResumeSchema, time_stats=None, use_cache=True):
+    """
+    One cached structured-output call of response_format on the parsed text.
+    Returns the message JSON (with "parsed").
+    """
+    use_cache = use_cache and not LLM_CACHE_DISABLED
+    backend = get_llm_backend()
+    cache_key = llm_cache_key(prompt, parsed_data, schema=response_format, backend=backend.name)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        metrics.CACHE_REQUESTS.inc(cache="llm", result="hit" if cached is not None else "miss")
+        if time_stats is not None:
+            time_stats["llm_cache_hit"] = cached is not None
+            time_stats["llm_cache_hits"] = llm_cache.hits
+            time_stats["llm_cache_misses"] = llm_cache.misses
+        if cached is not None:
+            print("♻️ Using cached OpenAI response.")
+            no_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            record_llm_usage(no_usage, 0.0, backend.name, time_stats, response_format.__name__, cached=True)
+            return cached
 
-    print(
-        f"Prompt Tokens: {completion.usage.prompt_tokens}, "
-        f"Completion Tokens: {completion.usage.completion_tokens}, "
-        f"Total Tokens: {completion.usage.total_tokens}"
-    )
+    print(f"🔮 Calling the {backend.name} LLM backend...")
+    generation_stats = {}
+    with timer(metrics.LLM_GENERATION_SECONDS, generation_stats, "seconds",
+               backend=backend.name, schema=response_format.__name__):
+        response, usage = llm_breaker.call(
+            backend.parse,
+            OPENAI_MODEL,
+            OPENAI_TEMPERATURE,
+            [
+                {"role": "system", "content": str(prompt)},
+                {"role": "user", "content": str(parsed_data)}
+            ],
+            response_format,
+        )
+    record_llm_usage(usage, generation_stats["seconds"], backend.name, time_stats, response_format.__name__)
+    if use_cache:
+        llm_cache.set(cache_key, response)
     return response
 
-#Core Pipeline
+def record_llm_usage(usage, seconds, backend_name, time_stats=None, schema="ResumeSchema", cached=False):
+    """
+    Count one call's tokens and generation speed, add them to the resume's
+    totals in time_stats, and append the call to the resume's ledger
+    (time_stats["llm_calls"], stored on the Mongo document).
+    A cached response is logged in the ledger with zero tokens.
+    """
+    if not cached:
+        metrics.LLM_TOKENS.inc(usage["prompt_tokens"], backend=backend_name, kind="prompt")
+        metrics.LLM_TOKENS.inc(usage["completion_tokens"], backend=backend_name, kind="completion")
+        if seconds > 0:
+            metrics.LLM_TOKENS_PER_SECOND.observe(usage["completion_tokens"] / seconds, backend=backend_name)
+    if time_stats is not None:
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            time_stats[key] = time_stats.get(key, 0) + usage[key]
+        time_stats["llm_generation_time"] = time_stats.get("llm_generation_time", 0) + seconds
+        time_stats.setdefault("llm_calls", []).append({
+            "model": OPENAI_MODEL,
+            "backend": backend_name,
+            "schema": schema,
+            "cached": cached,
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+            "seconds": seconds,
+            "timestamp": datetime.now(timezone.utc),
+        })
+
 @log_time
-def run_parse_and_infer(file_path: str, output_file: str):
+def call_openai(prompt, parsed_data, time_stats=None, use_cache=True):
     """
-    Core function that:
-      1) Parses the given file path.
-      2) Calls the OpenAI API with the parsed text.
-      3) Saves the JSON output to output_file.
-    Returns a tuple: (time_stats, parsed_text, llm_output)
+    Run structured extraction on the parsed text.
+    Identical requests are answered from the local response cache unless
+    use_cache is False or LLM_CACHE_DISABLED is set.
+    EXTRACTION_MODE picks one ResumeSchema call ("single"), per-section calls
+    ("sections"), or sections only for long inputs ("auto"). A single call
+    that runs out of output tokens falls back to sections unless the mode
+    is "single".
     """
-    time_stats = {}
-    total_start = time.time()
+    mode = EXTRACTION_MODE
+    if mode == "auto":
+        tokens = count_tokens(parsed_data, OPENAI_MODEL) or len(str(parsed_data))
+        mode = "sections" if tokens > SECTION_FANOUT_MIN_TOKENS else "single"
 
-    parse_start = time.time()
-    parsed_data = parse_file(file_path)
-    time_stats["pdf_parse_time"] = time.time() - parse_start
-    print(f"📄 File Parsing Time: {time_stats['pdf_parse_time']:.2f}s")
+    if mode == "sections":
+        return call_openai_sections(prompt, parsed_data, time_stats, use_cache)
+
+    import openai
+    try:
+        response = structured_completion(prompt, parsed_data, ResumeSchema, time_stats, use_cache)
+    except openai.LengthFinishReasonError:
+        if EXTRACTION_MODE == "single":
+            raise
+        print("✂️ Output hit the token limit; retrying as per-section calls.")
+        return call_openai_sections(prompt, parsed_data, time_stats, use_cache)
+    if time_stats is not None:
+        time_stats["extraction_mode"] = "single"
+    return response
 
+#Section Fan-out
+def _extract_section_part(prompt, section, text, part, parts, use_cache):
+    """
+    Extract one section (or one work-history chunk). A work-history chunk
+    that still runs out of output tokens is split in half and retried.
+    Returns (list of parsed dicts, list of per-call time_stats).
+    """
+    import openai
+    call_stats = {}
+    try:
+        response = structured_completion(
+            prompt + section_instruction(section, part, parts),
+            text,
+            SECTION_SCHEMAS[section],
+            call_stats,
+            use_cache
+        )
+    except openai.LengthFinishReasonError:
+        segments = split_projects(text)
+        if section != WORK_HISTORY_SECTION or len(segments) < 2:
+            raise
+        middle = len(segments) // 2
+        first = _extract_section_part(prompt, section, "\n".join(segments[:middle]), part, parts, use_cache)
+        second = _extract_section_part(prompt, section, "\n".join(segments[middle:]), part, parts, use_cache)
+        return first[0] + second[0], first[1] + second[1]
+    return [json.loads(response).get("parsed") or {}], [call_stats]
+
+def submit_llm_call(pool, func, *args):
+    """
+    Submit an LLM call to pool in a copy of the current context (so the
+    trace ID follows it), recording how long it queued for a worker.
+    """
+    submitted_at = time.time()
+    context = contextvars.copy_context()
+
+    def run():
+        metrics.LLM_QUEUE_SECONDS.observe(time.time() - submitted_at)
+        return func(*args)
+    return pool.submit(context.run, run)
+
+def call_openai_sections(prompt, parsed_data, time_stats=None, use_cache=True):
+    """
+    Extract ResumeSchema as concurrent per-section calls (see utils.sections):
+    profile/preferences/certifications, skill summary, skill evaluation, and
+    work history chunked at project boundaries when it exceeds
+    WORK_HISTORY_CHUNK_TOKENS. Results are merged and validated into one
+    ResumeSchema and returned in call_openai()'s output format.
+    """
+    count = lambda text: count_tokens(text, OPENAI_MODEL) or len(text)
+    text = str(parsed_data)
+    jobs = []
+    for section in SECTION_GROUPS:
+        if section == WORK_HISTORY_SECTION:
+            chunks = chunk_segments(split_projects(text), WORK_HISTORY_CHUNK_TOKENS, count)
+            jobs.extend((section, chunk, i + 1, len(chunks)) for i, chunk in enumerate(chunks))
+        else:
+            jobs.append((section, text, 1, 1))
+    print(f"🔀 Extracting {len(SECTION_GROUPS)} sections with {len(jobs)} parallel calls.")
+
+    section_outputs = {section: [] for section in SECTION_GROUPS}
+    call_stats = []
+    with ThreadPoolExecutor(max_workers=min(len(jobs), SECTION_FANOUT_WORKERS)) as pool:
+        futures = [
+            (section, submit_llm_call(pool, _extract_section_part, prompt, section, chunk, part, parts, use_cache))
+            for section, chunk, part, parts in jobs
+        ]
+        # Collected in submission order so work history stays chronological.
+        for section, future in futures:
+            outputs, stats = future.result()
+            section_outputs[section].extend(outputs)
+            call_stats.extend(stats)
+
+    resume = merge_sections(section_outputs)
+    if time_stats is not None:
+        time_stats["extraction_mode"] = "sections"
+        time_stats["llm_section_calls"] = len(call_stats)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens", "llm_generation_time"):
+            time_stats[key] = time_stats.get(key, 0) + sum(stats.get(key, 0) for stats in call_stats)
+        time_stats.setdefault("llm_calls", []).extend(call for stats in call_stats for call in stats.get("llm_calls", []))
+        if use_cache and not LLM_CACHE_DISABLED:
+            time_stats["llm_cache_hit"] = all(stats.get("llm_cache_hit") for stats in call_stats)
+            time_stats["llm_cache_hits"] = llm_cache.hits
+            time_stats["llm_cache_misses"] = llm_cache.misses
+    return to_llm_output(resume)
+
+#Input Compaction
+def compact_input(parsed_data, time_stats=None):
+    """
+    Compact the parsed text before it becomes the LLM user message
+    (see utils.compact). Token counts before/after are logged and recorded
+    in time_stats. Disabled with COMPACT_INPUT=0.
+    """
+    if not COMPACT_INPUT:
+        return parsed_data
+    compacted = compact_text(parsed_data)
+    tokens_before = count_tokens(parsed_data, OPENAI_MODEL)
+    tokens_after = count_tokens(compacted, OPENAI_MODEL)
+    if tokens_before:
+        print(f"✂️ Compacted input: {tokens_before} → {tokens_after} tokens ({1 - tokens_after / tokens_before:.0%} saved)")
+    if time_stats is not None:
+        time_stats["input_tokens_before"] = tokens_before
+        time_stats["input_tokens_after"] = tokens_after
+        time_stats["input_chars_before"] = len(str(parsed_data))
+        time_stats["input_chars_after"] = len(compacted)
+    return compacted
+
+#Core Pipeline
+def infer_and_save(parsed_data, output_file, time_stats):
+    """
+    Calls the OpenAI API with already-parsed text (compacted first) and saves
+    the JSON output to output_file. Records total_inference_time in time_stats.
+    """
     prompt = RESUME_EXTRACTION_PROMPT
     #print(f"🔍 Parsed data {parsed_data}")
 
     inference_start = time.time()
-    llm_output = call_openai(prompt, parsed_data)
+    llm_output = call_openai(prompt, compact_input(parsed_data, time_stats), time_stats)
     time_stats["total_inference_time"] = time.time() - inference_start
 
     parsed_json = json.loads(llm_output)
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(parsed_json.get("parsed"), f, ensure_ascii=False, indent=4)
     print(f"✅ Final output saved to {output_file}")
-
-    time_stats["total_time"] = time.time() - total_start
-    print(f"⏱️ Total Inference Time: {time_stats['total_inference_time']:.2f}s")
-    print(f"⏱️ Total Execution Time: {time_stats['total_time']:.2f}s")
-
-    return time_stats, parsed_data, llm_output
+    return llm_output
 
 #Generate Unique ID
 def generate_unique_id(file_name):
     """
     Creates a unique ID based on file name + timestamp.
+    A short random suffix keeps IDs unique (unique_id has a unique index)
+    when the same file name is processed twice within a second.
     """
     import time
+    import secrets
     base_name = os.path.splitext(os.path.basename(file_name))[0]
     sanitized_name = base_name.replace(" ", "_")
     timestamp = int(time.time())
-    return f"{sanitized_name}_{timestamp}"
+    return f"{sanitized_name}_{timestamp}_{secrets.token_hex(3)}"
 
 #Store in MongoDB
-def store_in_mongo(unique_id, file_name, parsed_data, llm_output, time_stats):
+def build_resume_document(unique_id, file_name, llm_output, time_stats, extra_fields=None):
     """
-    Insert a record in the MongoDB collection.
+    Build the Mongo document stored for one processed resume.
+    extra_fields (e.g. content/text hashes, duplicate_of) are merged in.
+    The per-call LLM ledger is stored as llm_calls, with its totals in
+    llm_usage, next to the per-stage latencies in time_stats.
     """
+    time_stats = dict(time_stats)
+    llm_calls = time_stats.pop("llm_calls", [])
+    # The backend that actually answered ("batch" for Batch API ingests, ...);
+    # None when no LLM call was made (duplicates).
+    backends = sorted({call["backend"] for call in llm_calls})
     doc = {
         "unique_id": unique_id,
         "file_name": file_name,
+        "input_format": os.path.splitext(file_name)[1].lower().lstrip("."),
+        "trace_id": time_stats.get("trace_id"),
         # "parsed_data": parsed_data,
         "llm_output": json.loads(llm_output).get("parsed", {}),
         "timestamp": datetime.now(timezone.utc),
-        "time_stats": time_stats
+        "time_stats": time_stats,
+        "llm_cache_hit": time_stats.get("llm_cache_hit", False),
+        "llm_calls": llm_calls,
+        "llm_usage": {
+            "model": OPENAI_MODEL,
+            "backend": "+".join(backends) or None,
+            "calls": len(llm_calls),
+            "cached_calls": sum(1 for call in llm_calls if call.get("cached")),
+            "prompt_tokens": time_stats.get("prompt_tokens", 0),
+            "completion_tokens": time_stats.get("completion_tokens", 0),
+            "total_tokens": time_stats.get("total_tokens", 0),
+        },
     }
-    result = collection.insert_one(doc)
+    doc.update(extra_fields or {})
+    return doc
+
+def store_in_mongo(unique_id, file_name, parsed_data, llm_output, time_stats, extra_fields=None):
+    """
+    Insert a record in the MongoDB collection.
+    """
+    doc = build_resume_document(unique_id, file_name, llm_output, time_stats, extra_fields)
+    try:
+        with timer(metrics.DB_WRITE_SECONDS, op="insert_one"):
+            result = get_collection().insert_one(doc)
+    except DuplicateKeyError:
+        # A retried insert whose earlier attempt reached the server before the
+        # connection dropped; the caller-assigned _id is already stored.
+        if "_id" in (extra_fields or {}) and get_collection().find_one({"_id": doc["_id"]}, {"_id": 1}):
+            return doc["_id"]
+        raise
     print(f"Inserted document with _id: {result.inserted_id}")
     return result.inserted_id
 
+_bulk_writer = None
+_bulk_writer_lock = threading.Lock()
+
+def get_bulk_writer():
+    """
+    Return the process-wide BulkWriter for the resumes collection.
+    """
+    global _bulk_writer
+    with _bulk_writer_lock:
+        if _bulk_writer is None:
+            _bulk_writer = BulkWriter(
+                get_collection(),
+                batch_size=MONGO_BULK_BATCH_SIZE,
+                flush_interval=MONGO_BULK_FLUSH_INTERVAL
+            )
+        return _bulk_writer
+
+def store_in_mongo_buffered(unique_id, file_name, parsed_data, llm_output, time_stats, extra_fields=None):
+    """
+    Like store_in_mongo(), but queues the document on the shared BulkWriter.
+    Returns a Future that resolves to the inserted _id.
+    """
+    doc = build_resume_document(unique_id, file_name, llm_output, time_stats, extra_fields)
+    return get_bulk_writer().submit(doc)
+
+def store_in_mongo_buffered_wait(unique_id, file_name, parsed_data, llm_output, time_stats, extra_fields=None):
+    """
+    store_in_mongo_buffered() and wait for the write. With a caller-assigned
+    _id in extra_fields it is safe to retry: if an earlier attempt's batch
+    reached the server, the stored _id is returned.
+    """
+    try:
+        return store_in_mongo_buffered(unique_id, file_name, parsed_data, llm_output, time_stats, extra_fields).result()
+    except Exception:
+        if "_id" in (extra_fields or {}) and get_collection().find_one({"_id": extra_fields["_id"]}, {"_id": 1}):
+            return extra_fields["_id"]
+        raise
+
+#Deduplication
+def resolve_duplicate(existing, unique_id, original_filename, parsed_data, time_stats, hashes, dedup, store=None):
+    """
+    Build the process_resume() result for a resume that matched a stored one.
+    dedup="return" hands back the stored document's IDs and output;
+    dedup="link" stores a new document pointing at it via duplicate_of,
+    reusing its output (no LLM call either way).
+    """
+    print(f"♻️ Duplicate of stored document {existing['_id']}; skipping LLM.")
+    llm_output = json.dumps({"parsed": existing.get("llm_output", {})}, ensure_ascii=False)
+    time_stats["duplicate_of"] = str(existing["_id"])
+    if dedup == "link":
+        store = store or store_in_mongo
+        # _id is assigned here so that a retried insert can't store it twice.
+        extra_fields = dict(hashes, duplicate_of=existing["_id"], _id=ObjectId())
+        inserted_id = store(unique_id, original_filename, parsed_data, llm_output, time_stats, extra_fields)
+    else:
+        inserted_id, unique_id = existing["_id"], existing.get("unique_id", unique_id)
+    return {
+        "inserted_id": inserted_id,
+        "unique_id": unique_id,
+        "time_stats": time_stats,
+        "parsed_data": parsed_data,
+        "llm_output": llm_output,
+        "duplicate_of": existing["_id"]
+    }
+
+#Stage Retries
+def run_stage(stage, func, *args, time_stats=None, on_retry=None, **kwargs):
+    """
+    Run one pipeline stage with retry_call(). Earlier stages' outputs are
+    kept by the caller, so a retry only repeats the stage that failed.
+    The stage's duration (retries included) goes to resume_stage_seconds and
+    time_stats["<stage>_time"]; retries to time_stats["retries"][stage]. Both
+    add up over repeated runs of a stage (e.g. the two dedup lookups).
+    """
+    def record_retry(stage, attempt, delay, error):
+        metrics.RETRIES.inc(stage=stage, kind=classify_error(error))
+        if time_stats is not None:
+            retries = time_stats.setdefault("retries", {})
+            retries[stage] = retries.get(stage, 0) + 1
+        if on_retry:
+            on_retry(stage, attempt, delay, error)
+
+    with timer(metrics.STAGE_SECONDS, time_stats, f"{stage}_time", stage=stage):
+        return retry_call(
+            func, *args,
+            stage=stage,
+            max_attempts=RETRY_MAX_ATTEMPTS,
+            base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY,
+            on_retry=record_retry,
+            **kwargs
+        )
+
 #Main Function
-def process_resume(file_path, original_filename):
+def process_resume(file_path, original_filename, on_stage=None, dedup=None, on_retry=None):
     """
     Orchestrates:
-      1) Parsing
-      2) OpenAI inference
-      3) Unique ID generation
-      4) Saving output to local file
-      5) Storing in Mongo
+      1) Duplicate check on the file bytes
+      2) Parsing
+      3) Duplicate check on the normalized parsed text
+      4) OpenAI inference
+      5) Unique ID generation
+      6) Saving output to local file
+      7) Storing in Mongo (with content_hash / text_hash)
+    dedup overrides DEDUP_MODE ("return", "link" or "off"); see resolve_duplicate().
+    on_stage, if given, is called with "parsing", "llm", "storing" and
+    "stored" as the pipeline progresses (used for progress display).
+    Each stage is retried on transient failures (see run_stage());
+    on_retry(stage, attempt, delay, error) is called before each retry.
+    Raises utils.retry.StageError when a stage fails for good.
+    Each call starts a new trace; its ID is in time_stats["trace_id"].
     """
+    new_trace_id()
+    try:
+        result = _process_resume(file_path, original_filename, on_stage, dedup, on_retry)
+    except Exception:
+        metrics.RESUMES.inc(result="error")
+        raise
+    record_resume_outcome(result)
+    return result
+
+def record_resume_outcome(result):
+    metrics.RESUMES.inc(result="duplicate" if "duplicate_of" in result else "ok")
+    total_tokens = result["time_stats"].get("total_tokens")
+    if total_tokens:
+        metrics.RESUME_TOKENS.observe(total_tokens)
+
+def _process_resume(file_path, original_filename, on_stage, dedup, on_retry):
+    dedup = dedup or DEDUP_MODE
+    total_start = time.time()
     unique_id = generate_unique_id(file_path)
     output_file = f"final_output_{unique_id}.json"
+    time_stats = {}
+    parsed_data = None
 
-    time_stats, parsed_data, llm_output = run_parse_and_infer(file_path, output_file)
+    retry_stats = {}
+    with timer(metrics.STAGE_SECONDS, retry_stats, "read_time", stage="read"):
+        hashes = {"content_hash": hash_file(file_path)}
 
-    inserted_id = store_in_mongo(unique_id, original_filename, parsed_data, llm_output, time_stats)
+    existing = None
+    if dedup != "off":
+        existing = run_stage(
+            "dedup", find_duplicate, get_collection(), content_hash=hashes["content_hash"],
+            time_stats=retry_stats, on_retry=on_retry
+        )
 
+    if existing is None:
+        if on_stage:
+            on_stage("parsing")
+        parsed_data, time_stats = run_stage(
+            "parse", parse_with_stats, file_path, hashes["content_hash"], time_stats=retry_stats, on_retry=on_retry
+        )
+        print(f"📄 File Parsing Time: {time_stats['pdf_parse_time']:.2f}s")
+        hashes["text_hash"] = text_hash(parsed_data)
+        if dedup != "off":
+            existing = run_stage(
+                "dedup", find_duplicate, get_collection(), text_hash=hashes["text_hash"],
+                time_stats=retry_stats, on_retry=on_retry
+            )
+    time_stats.update(retry_stats)
+    time_stats["trace_id"] = current_trace_id()
+
+    if existing is not None:
+        if on_stage:
+            on_stage("storing")
+        time_stats["total_time"] = time.time() - total_start
+        store = lambda *args: run_stage("store", store_in_mongo, *args, time_stats=time_stats, on_retry=on_retry)
+        result = resolve_duplicate(existing, unique_id, original_filename, parsed_data, time_stats, hashes, dedup, store)
+        if on_stage:
+            on_stage("stored")
+        return result
+
+    if on_stage:
+        on_stage("llm")
+    llm_output = run_stage(
+        "llm", infer_and_save, parsed_data, output_file, time_stats, time_stats=time_stats, on_retry=on_retry
+    )
+    time_stats["total_time"] = time.time() - total_start
+    print(f"⏱️ Total Inference Time: {time_stats['total_inference_time']:.2f}s")
+    print(f"⏱️ Total Execution Time: {time_stats['total_time']:.2f}s")
+
+    if on_stage:
+        on_stage("storing")
+    # _id is assigned here so that a retried insert can't store the resume twice.
+    extra_fields = dict(hashes, _id=ObjectId())
+    inserted_id = run_stage(
+        "store", store_in_mongo, unique_id, original_filename, parsed_data, llm_output, time_stats, extra_fields,
+        time_stats=time_stats, on_retry=on_retry
+    )
+    if on_stage:
+        on_stage("stored")
+
+    return {
+        "inserted_id": inserted_id,
+        "unique_id": unique_id,
+        "time_stats": time_stats,
+        "parsed_data": parsed_data,
+        "llm_output": llm_output
+    }
+
+#Batch Processing
+def parse_with_stats(file_path, content_hash=None):
+    """
+    Parse one file and return (parsed_data, time_stats).
+    Top-level so it can run in a worker process or executor.
+    """
+    time_stats = {}
+    parse_start = time.time()
+    parsed_data = parse_file(file_path, time_stats, content_hash=content_hash)
+    time_stats["pdf_parse_time"] = time.time() - parse_start
+    return parsed_data, time_stats
+
+def _infer_and_store_for_batch(file_path, original_filename, parsed_data, time_stats):
+    """
+    Runs in a thread: LLM call, local output file and Mongo insert for one parsed file.
+    """
+    stage_start = time.time()
+    time_stats["trace_id"] = new_trace_id()
+    unique_id = generate_unique_id(file_path)
+    output_file = f"final_output_{unique_id}.json"
+    hashes = {"content_hash": hash_file(file_path), "text_hash": text_hash(parsed_data)}
+    # Dedup and store are retried like in process_resume(); a StageError
+    # carries the failed stage to iter_process_resumes_batch().
+    store_buffered = lambda *args: run_stage("store", store_in_mongo_buffered_wait, *args, time_stats=time_stats)
+    if DEDUP_MODE != "off":
+        existing = run_stage("dedup", find_duplicate, get_collection(), time_stats=time_stats, **hashes)
+        if existing is not None:
+            time_stats["total_time"] = time_stats["pdf_parse_time"] + (time.time() - stage_start)
+            return resolve_duplicate(
+                existing, unique_id, original_filename, parsed_data, time_stats, hashes, DEDUP_MODE, store_buffered
+            )
+
+    llm_output = run_stage("llm", infer_and_save, parsed_data, output_file, time_stats, time_stats=time_stats)
+    time_stats["total_time"] = time_stats["pdf_parse_time"] + (time.time() - stage_start)
+    # Batch inserts are grouped with other threads' writes by the BulkWriter;
+    # _id is assigned here so that a retried insert can't store the resume twice.
+    inserted_id = store_buffered(
+        unique_id, original_filename, parsed_data, llm_output, time_stats, dict(hashes, _id=ObjectId())
+    )
     return {
         "inserted_id": inserted_id,
         "unique_id": unique_id,
@@ -165,12 +814,96 @@ def process_resume(file_path, original_filename):
         "llm_output": llm_output
     }
 
+def iter_process_resumes_batch(file_paths, original_filenames=None, max_workers=None, llm_workers=None):
+    """
+    Process many resumes, yielding one result dict per file in completion order.
+
+    Parsing (CPU-bound) is fanned out over a process pool of max_workers
+    processes (default: BATCH_PARSE_WORKERS, i.e. one per core). As soon as a
+    file is parsed, its LLM call and Mongo insert (network-bound) are started
+    on a thread pool of llm_workers threads, so both stages overlap.
+
+    Every yielded dict has "file_path" and "file_name". Successful results
+    also carry the same keys as process_resume(); failures instead carry
+    "error" (the message) and "stage" ("parse", "dedup", "llm" or "store").
+    """
+    file_paths = list(file_paths)
+    if original_filenames is None:
+        original_filenames = [os.path.basename(path) for path in file_paths]
+    return iter_process_resume_jobs(zip(file_paths, original_filenames), max_workers, llm_workers)
+
+def iter_process_resume_jobs(jobs, max_workers=None, llm_workers=None):
+    """
+    Like iter_process_resumes_batch(), but takes an iterable of
+    (file_path, file_name) pairs that may still be producing them (e.g.
+    files that are still downloading): each file enters the pipeline as
+    soon as the iterable yields it, and finished results are yielded while
+    later files are still arriving.
+    """
+    max_workers = max_workers or BATCH_PARSE_WORKERS
+    llm_workers = llm_workers or BATCH_LLM_WORKERS
+    results = queue.Queue()
+
+    def on_llm_done(future, file_path, file_name):
+        result = {"file_path": file_path, "file_name": file_name}
+        try:
+            result.update(future.result())
+            record_resume_outcome(result)
+        except Exception as e:
+            metrics.RESUMES.inc(result="error")
+            result.update({"error": str(e), "stage": getattr(e, "stage", "llm")})
+        results.put(result)
+
+    def on_parse_done(future, file_path, file_name):
+        try:
+            parsed_data, time_stats = future.result()
+        except Exception as e:
+            metrics.RESUMES.inc(result="error")
+            results.put({"file_path": file_path, "file_name": file_name, "error": str(e), "stage": "parse"})
+            return
+        # Parsing ran in a worker process, so its metrics are recorded here.
+        metrics.STAGE_SECONDS.observe(time_stats["pdf_parse_time"], stage="parse")
+        try:
+            llm_future = submit_llm_call(llm_pool, _infer_and_store_for_batch, file_path, file_name, parsed_data, time_stats)
+        except RuntimeError as e:
+            # The consumer stopped early and the thread pool is already shut down.
+            results.put({"file_path": file_path, "file_name": file_name, "error": str(e), "stage": "llm"})
+            return
+        llm_future.add_done_callback(lambda f: on_llm_done(f, file_path, file_name))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+        pending = 0
+        for file_path, file_name in jobs:
+            parse_future = parse_pool.submit(parse_with_stats, file_path)
+            parse_future.add_done_callback(
+                lambda f, file_path=file_path, file_name=file_name: on_parse_done(f, file_path, file_name)
+            )
+            pending += 1
+            while True:
+                try:
+                    result = results.get_nowait()
+                except queue.Empty:
+                    break
+                pending -= 1
+                yield result
+        for _ in range(pending):
+            yield results.get()
+
+def process_resumes_batch(file_paths, original_filenames=None, max_workers=None, llm_workers=None):
+    """
+    Batch counterpart of process_resume(). Returns the list of per-file result
+    dicts from iter_process_resumes_batch() in completion order.
+    """
+    return list(iter_process_resumes_batch(file_paths, original_filenames, max_workers, llm_workers))
+
 
 def main():
     """
     This is the CLI entry point. 
     Hard-coded example usage for local debugging.
     """
+    ensure_indexes(get_collection())
     file_path = "/Users/Apple/Desktop/Givery BP/Givery-Resume-Parsing/data/JP resume format 021.docx"
     result_info = process_resume(file_path, "JP resume format 001.pdf")
 
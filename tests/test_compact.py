@@ -0,0 +1,97 @@
+from utils.compact import compact_text
+from knowledge.converter_pool import export_markdown
+
+HEADER = "職務経歴書 山田太郎 2024年01月08日現在"
+FOOTER = "株式会社サンプル 採用担当者様"
+
+
+def _page(*body):
+    return "\n".join([HEADER, "", *body, "", FOOTER, "", "- 1 -"])
+
+
+def test_repeated_body_lines_survive():
+    projects = []
+    for name in ("案件A", "案件B", "案件C"):
+        projects += [
+            f"プロジェクト:{name}",
+            "担当工程:詳細設計・製造・単体テスト",
+            "役割:メンバー(5名)",
+            "",
+        ]
+    text = compact_text(_page(*projects))
+
+    assert text.count("担当工程:詳細設計・製造・単体テスト") == 3
+    assert text.count("役割:メンバー(5名)") == 3
+
+
+def test_page_headers_and_footers_are_kept_once():
+    pages = [
+        _page(f"プロジェクト:案件{i}", "担当工程:詳細設計・製造・単体テスト", "役割:メンバー(5名)", "")
+        for i in range(3)
+    ]
+    text = compact_text("\n\n-----\n\n".join(pages))
+
+    assert text.count(HEADER) == 1
+    assert text.count(FOOTER) == 1
+    assert text.count("担当工程:詳細設計・製造・単体テスト") == 3
+    assert text.count("役割:メンバー(5名)") == 3
+    assert "- 1 -" not in text
+
+
+def test_edge_lines_that_also_occur_in_a_body_are_kept():
+    pages = [_page("役割:メンバー(5名)", "プロジェクト:案件A", "役割:メンバー(5名)") for _ in range(3)]
+    text = compact_text("\n-----\n".join(pages))
+
+    assert text.count("役割:メンバー(5名)") == 6
+
+
+def test_lines_repeated_on_fewer_pages_are_kept():
+    pages = [_page("本文"), _page("本文")]
+    text = compact_text("\n-----\n".join(pages))
+
+    assert text.count(HEADER) == 2
+
+
+class _DoclingDocument:
+    """
+    Just the parts of a docling DoclingDocument that export_markdown() uses.
+    """
+
+    def __init__(self, pages):
+        self.pages = {page_no: None for page_no in range(1, len(pages) + 1)}
+        self._markdown = dict(zip(self.pages, pages))
+
+    def export_to_markdown(self, page_no=None):
+        if page_no is None:
+            return "\n\n".join(self._markdown.values())
+        return self._markdown[page_no]
+
+
+def test_docling_pages_are_separated_for_boilerplate_removal():
+    # export_to_markdown() output per page: headings, tables, image placeholders,
+    # and a header/footer the layout model didn't mark as page furniture.
+    pages = [
+        "\n\n".join([
+            HEADER,
+            f"## 職務経歴{i}",
+            "| 期間 | 業務内容 |\n|------|----------|\n| 2020年04月～2021年03月 | 詳細設計・製造 |",
+            "<!-- image -->",
+            FOOTER,
+        ])
+        for i in range(3)
+    ]
+    parsed = export_markdown(_DoclingDocument(pages))
+    text = compact_text(parsed)
+
+    assert parsed.count("\n\n-----\n\n") == 2
+    assert text.count(HEADER) == 1
+    assert text.count(FOOTER) == 1
+    assert text.count("詳細設計・製造") == 3
+    assert all(f"## 職務経歴{i}" in text for i in range(3))
+
+
+def test_docling_documents_without_pages_are_exported_whole():
+    document = _DoclingDocument([])
+    document.export_to_markdown = lambda page_no=None: "## 職務経歴書"
+
+    assert export_markdown(document) == "## 職務経歴書"
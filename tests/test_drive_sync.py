@@ -0,0 +1,98 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("requests")
+
+from utils import drive, drive_sync
+from utils.mock_drive_server import make_server, put_file
+
+T1, T2, T3, T4, T5 = (f"2025-01-0{day}T09:00:00.000Z" for day in range(1, 6))
+
+
+@pytest.fixture
+def drive_server(monkeypatch, tmp_path):
+    # A small page size so listing has to follow nextPageToken.
+    server = make_server(port=0, page_size=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(drive, "DRIVE_API_URL", f"http://127.0.0.1:{server.server_port}/files")
+    monkeypatch.setattr(drive_sync, "DRIVE_SYNC_STATE_DIR", str(tmp_path))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class Processor:
+    """
+    Stands in for the batch pipeline: fails files whose content is b"bad".
+    """
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, downloaded):
+        for f, path in downloaded:
+            with open(path, "rb") as fh:
+                content = fh.read()
+            self.seen.append(f["name"])
+            yield f, ({"error": "parse failed", "stage": "parse"} if content == b"bad" else {"unique_id": f["id"]})
+
+
+def _listed_since(server):
+    return [params["q"].split("modifiedTime >= ")[-1] if "modifiedTime" in params["q"] else None
+            for path, params in server.requests if path.endswith("/files") and not params.get("pageToken")]
+
+
+def test_sync_retries_failures_and_skips_unchanged_files(drive_server):
+    put_file(drive_server, "a", "a.pdf", T1, b"a")
+    put_file(drive_server, "b", "b.pdf", T2, b"bad")
+    put_file(drive_server, "c", "c.docx", T3, b"c")
+    put_file(drive_server, "notes", "notes.txt", T3, b"n")
+    drive_server.unavailable.add("c")
+
+    # First pass: b fails in the pipeline, c fails to download.
+    processor = Processor()
+    results = drive_sync.sync_folder("folder", processor)
+    assert sorted(processor.seen) == ["a.pdf", "b.pdf"]
+    assert {r["file_id"]: r.get("stage") for r in results if "error" in r} == {"b": "parse", "c": "download"}
+    state = drive_sync.load_state("folder")
+    # The watermark stops at the oldest failure; a (older) is never listed again.
+    assert state == {"watermark": T2, "files": {}}
+
+    # Second pass: the failures are retried, a changed and d is new.
+    drive_server.unavailable.clear()
+    put_file(drive_server, "b", "b.pdf", T2, b"b")
+    put_file(drive_server, "d", "d.xlsx", T4, b"d")
+    put_file(drive_server, "a", "a.pdf", T5, b"a2")
+    processor = Processor()
+    results = drive_sync.sync_folder("folder", processor)
+    assert sorted(processor.seen) == ["a.pdf", "b.pdf", "c.docx", "d.xlsx"]
+    assert not any("error" in r for r in results)
+    assert drive_sync.load_state("folder") == {"watermark": T5, "files": {"a": T5}}
+
+    # Third pass: nothing changed, so nothing is downloaded or processed.
+    processor = Processor()
+    downloads = sum(1 for path, params in drive_server.requests if params.get("alt") == "media")
+    assert drive_sync.sync_folder("folder", processor) == []
+    assert processor.seen == []
+    assert sum(1 for path, params in drive_server.requests if params.get("alt") == "media") == downloads
+
+    assert _listed_since(drive_server) == [None, f"'{T2}'", f"'{T5}'"]
+
+
+def test_download_restarts_a_body_that_breaks_off(drive_server, monkeypatch):
+    monkeypatch.setattr(drive.time, "sleep", lambda seconds: None)
+    put_file(drive_server, "a", "a.pdf", T1, b"0123456789" * 1000)
+    drive_server.broken["a"] = 2
+
+    path = drive.download_drive_file("a", "a.pdf")
+    with open(path, "rb") as f:
+        assert f.read() == b"0123456789" * 1000
+    os.remove(path)
+    assert sum(1 for _, params in drive_server.requests if params.get("alt") == "media") == 3
+
+    drive_server.broken["a"] = drive.DRIVE_DOWNLOAD_RETRIES + 1
+    with pytest.raises(drive.requests.exceptions.RequestException):
+        drive.download_drive_file("a", "a.pdf")
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+from utils.mongo_client import get_collection
+
+# Documents stored before input_format existed: take it from the file name
+# ($regexFind needs MongoDB 4.2+).
+_INPUT_FORMAT = {
+    "$ifNull": [
+        "$input_format",
+        {"$let": {
+            "vars": {"ext": {"$regexFind": {"input": {"$ifNull": ["$file_name", ""]}, "regex": r"\.([^.]+)$"}}},
+            "in": {"$toLower": {"$ifNull": [{"$arrayElemAt": ["$$ext.captures", 0]}, "unknown"]}},
+        }},
+    ]
+}
+
+
+def _since(hours):
+    return {"timestamp": {"$gte": datetime.now(timezone.utc) - timedelta(hours=hours)}}
+
+
+def resumes_per_hour(hours=48, collection=None):
+    """
+    [{"hour", "resumes", "total_tokens"}] for the last `hours` hours (UTC).
+    """
+    collection = collection or get_collection()
+    return list(collection.aggregate([
+        {"$match": _since(hours)},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d %H:00", "date": "$timestamp"}},
+            "resumes": {"$sum": 1},
+            "total_tokens": {"$sum": {"$ifNull": ["$llm_usage.total_tokens", 0]}},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "hour": "$_id", "resumes": 1, "total_tokens": 1}},
+    ]))
+
+
+def tokens_by_format(hours=24 * 30, collection=None):
+    """
+    Average prompt/completion/total tokens per resume, grouped by input
+    format. Resumes answered entirely from cache or by dedup are excluded.
+    """
+    collection = collection or get_collection()
+    return list(collection.aggregate([
+        {"$match": dict(_since(hours), **{"llm_usage.total_tokens": {"$gt": 0}})},
+        {"$group": {
+            "_id": _INPUT_FORMAT,
+            "resumes": {"$sum": 1},
+            "avg_prompt_tokens": {"$avg": "$llm_usage.prompt_tokens"},
+            "avg_completion_tokens": {"$avg": "$llm_usage.completion_tokens"},
+            "avg_total_tokens": {"$avg": "$llm_usage.total_tokens"},
+            "max_total_tokens": {"$max": "$llm_usage.total_tokens"},
+        }},
+        {"$sort": {"resumes": -1}},
+        {"$project": {
+            "_id": 0, "input_format": "$_id", "resumes": 1, "avg_prompt_tokens": 1,
+            "avg_completion_tokens": 1, "avg_total_tokens": 1, "max_total_tokens": 1,
+        }},
+    ]))
+
+
+def slowest_files(limit=10, hours=24 * 7, collection=None):
+    """
+    The slowest resumes by total_time, with their per-stage latencies.
+    """
+    collection = collection or get_collection()
+    return list(collection.aggregate([
+        {"$match": dict(_since(hours), **{"time_stats.total_time": {"$exists": True}})},
+        {"$sort": {"time_stats.total_time": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0,
+            "file_name": 1,
+            "timestamp": 1,
+            "input_format": _INPUT_FORMAT,
+            "pdf_engine": "$time_stats.pdf_engine",
+            "total_time": "$time_stats.total_time",
+            "parse_time": "$time_stats.pdf_parse_time",
+            "llm_time": {"$ifNull": ["$time_stats.llm_time", "$time_stats.total_inference_time"]},
+            "llm_generation_time": "$time_stats.llm_generation_time",
+            "retries": "$time_stats.retries",
+            "total_tokens": "$llm_usage.total_tokens",
+        }},
+    ]))
+
+
+def _percentile(values_field, q):
+    # Element at floor(q * (n - 1)) of an array pushed in ascending order.
+    return {"$arrayElemAt": [
+        values_field,
+        {"$floor": {"$multiply": [q, {"$subtract": [{"$size": values_field}, 1]}]}},
+    ]}
+
+
+def latency_percentiles(hours=24 * 14, bucket="%Y-%m-%d", field="total_time", collection=None):
+    """
+    p50/p95/max of time_stats.<field> per time bucket (default: per day).
+    Computed on the server; works without $percentile (MongoDB < 7).
+    """
+    collection = collection or get_collection()
+    path = f"$time_stats.{field}"
+    return list(collection.aggregate([
+        {"$match": dict(_since(hours), **{f"time_stats.{field}": {"$type": "number"}})},
+        {"$sort": {f"time_stats.{field}": 1}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": bucket, "date": "$timestamp"}},
+            "values": {"$push": path},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "period": "$_id",
+            "resumes": {"$size": "$values"},
+            "p50": _percentile("$values", 0.5),
+            "p95": _percentile("$values", 0.95),
+            "max": {"$arrayElemAt": ["$values", -1]},
+        }},
+    ], allowDiskUse=True))
@@ -0,0 +1,62 @@
+import os
+
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+# Point at a local stub server (e.g. http://127.0.0.1:8000/v1) for tests.
+BATCH_BASE_URL = os.getenv("BATCH_BASE_URL") or None
+
+# Batch statuses after which polling stops.
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class OpenAIBatchBackend:
+    """
+    Batch API backend: upload a JSONL of requests, create a batch, poll it
+    and download its output. Any object with the same four methods can be
+    passed to bulk_extract instead (see BATCH_BACKENDS).
+    """
+
+    endpoint = "/v1/chat/completions"
+
+    def __init__(self, api_key=None, base_url=BATCH_BASE_URL):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+    def upload(self, jsonl_path):
+        with open(jsonl_path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create(self, input_file_id, metadata=None):
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=self.endpoint,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata=metadata
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        """
+        Return {"status", "output_file_id", "error_file_id", "request_counts"}.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "request_counts": counts.model_dump() if counts is not None else None,
+        }
+
+    def download(self, file_id):
+        return self.client.files.content(file_id).text
+
+
+BATCH_BACKENDS = {
+    "openai": OpenAIBatchBackend,
+}
+
+
+def get_batch_backend(name="openai", **kwargs):
+    if name not in BATCH_BACKENDS:
+        raise ValueError(f"Unknown batch backend: {name}")
+    return BATCH_BACKENDS[name](**kwargs)
@@ -0,0 +1,141 @@
+import re
+import functools
+import unicodedata
+from collections import Counter
+
+# A non-table, non-heading line among the first/last BOILERPLATE_EDGE_LINES
+# lines of at least BOILERPLATE_MIN_REPEATS pages is a page header/footer:
+# only its first occurrence is kept. A line that also occurs inside any page
+# body is content (e.g. the same role on several projects) and always stays.
+BOILERPLATE_MIN_REPEATS = 3
+BOILERPLATE_MIN_CHARS = 8
+BOILERPLATE_EDGE_LINES = 1
+
+# Full-width ASCII (except ～, which the schema uses in ranges like "1～5名"),
+# the ideographic space and half-width katakana. NFKC on these only changes
+# their width; other characters (①, ㈱, ...) are left as written.
+_WIDTH_RUN = re.compile(r"[　！-｝｡-ﾟ]+")
+_INLINE_SPACE = re.compile(r"[ \t ]+")
+_TABLE_RULE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_HORIZONTAL_RULE = re.compile(r"^([-*_=])\1{2,}$")
+# Page separators: the "-----" pymupdf4llm writes between pages, also used
+# to join docling's per-page exports (knowledge/converter_pool.py).
+_PAGE_BREAK = re.compile(r"^-{3,}$")
+_PAGE_NUMBER = re.compile(
+    r"^(-\s*\d{1,3}\s*-|\d{1,3}\s*/\s*\d{1,3}|(page|p\.)\s*\d{1,3}(\s*(/|of)\s*\d{1,3})?|\d{1,3}\s*ページ)$",
+    re.IGNORECASE
+)
+_EMPTY_CELLS = ("", "nan", "none", "-")
+
+
+def normalize_width(text):
+    return _WIDTH_RUN.sub(lambda m: unicodedata.normalize("NFKC", m.group()), text)
+
+
+def _split_row(line):
+    cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+    return ["" if cell.lower() in _EMPTY_CELLS else cell for cell in cells]
+
+
+def _compact_table(rows):
+    """
+    Drop rows with no content and columns that are empty in every row.
+    Empty cells inside kept columns stay, so values remain aligned with
+    their headers.
+    """
+    rows = [row for row in (_split_row(line) for line in rows) if any(row)]
+    width = max((len(row) for row in rows), default=0)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    keep = [i for i in range(width) if any(row[i] for row in rows)]
+    return [f"| {' | '.join(row[i] for i in keep)} |" for row in rows]
+
+
+def _is_boilerplate_candidate(line):
+    return not line.startswith(("|", "#")) and len(line) >= BOILERPLATE_MIN_CHARS
+
+
+def _page_edges(lines, page_starts, edge_lines=BOILERPLATE_EDGE_LINES):
+    """
+    Per page, the indexes of the first and last edge_lines non-empty lines.
+    """
+    bounds = list(zip(page_starts, page_starts[1:] + [len(lines)]))
+    edges = []
+    for start, end in bounds:
+        filled = [i for i in range(start, end) if lines[i]]
+        edges.append(set(filled[:edge_lines] + filled[-edge_lines:]))
+    return edges
+
+
+def compact_text(text):
+    """
+    Shrink parsed resume markdown before it is sent to the LLM:
+    width-normalize full-width ASCII / half-width katakana, collapse runs of
+    spaces, drop table rule lines, empty table rows/columns, page numbers,
+    image placeholders and repeated page headers/footers, and squeeze blank
+    lines.
+    """
+    lines = []
+    table = []
+    # Index in lines where each page begins.
+    page_starts = [0]
+    for line in normalize_width(str(text)).splitlines():
+        line = _INLINE_SPACE.sub(" ", line).strip()
+        # Checked before table rules, which a bare "-----" also matches.
+        if _PAGE_BREAK.match(line):
+            lines.extend(_compact_table(table))
+            table = []
+            page_starts.append(len(lines))
+            continue
+        if _TABLE_RULE.match(line):
+            continue
+        if line.startswith("|"):
+            table.append(line)
+            continue
+        if table:
+            lines.extend(_compact_table(table))
+            table = []
+        if _HORIZONTAL_RULE.match(line) or _PAGE_NUMBER.match(line) or line == "<!-- image -->":
+            continue
+        lines.append(line)
+    lines.extend(_compact_table(table))
+
+    edges = _page_edges(lines, page_starts)
+    # Number of pages each candidate line sits on the edge of.
+    counts = Counter(
+        line for page in edges for line in {lines[i] for i in page} if _is_boilerplate_candidate(line)
+    )
+    edge_indexes = set().union(*edges)
+    body_lines = {line for i, line in enumerate(lines) if i not in edge_indexes}
+    boilerplate = {
+        line for line, count in counts.items() if count >= BOILERPLATE_MIN_REPEATS and line not in body_lines
+    }
+    seen = set()
+    compacted = []
+    for i, line in enumerate(lines):
+        if i in edge_indexes and line in boilerplate:
+            if line in seen:
+                continue
+            seen.add(line)
+        if not line and (not compacted or not compacted[-1]):
+            continue
+        compacted.append(line)
+    return "\n".join(compacted).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text, model):
+    """
+    Count tokens locally with tiktoken; None if the tokenizer is unavailable.
+    """
+    try:
+        return len(_encoding(model).encode(str(text)))
+    except Exception:
+        return None
@@ -0,0 +1,46 @@
+import re
+import hashlib
+import unicodedata
+
+from utils.mongo_indexes import CONTENT_HASH_FIELD, TEXT_HASH_FIELD
+
+
+def normalize_text(text):
+    """
+    Normalize parsed text so that re-exports of the same resume hash equally:
+    NFKC (full-width -> half-width), lower-cased, all whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+DUPLICATE_SORT = [("timestamp", 1)]
+
+
+def duplicate_filter(content_hash=None, text_hash=None):
+    """
+    The find_duplicate() filter for the given hashes, or None if there are none.
+    """
+    conditions = []
+    if content_hash:
+        conditions.append({CONTENT_HASH_FIELD: content_hash})
+    if text_hash:
+        conditions.append({TEXT_HASH_FIELD: text_hash})
+    if not conditions:
+        return None
+    return {"$or": conditions, "duplicate_of": {"$exists": False}}
+
+
+def find_duplicate(collection, content_hash=None, text_hash=None):
+    """
+    Return the earliest stored original (not itself a linked duplicate) whose
+    file bytes or normalized text match, or None.
+    """
+    query = duplicate_filter(content_hash, text_hash)
+    if query is None:
+        return None
+    return collection.find_one(query, sort=DUPLICATE_SORT)
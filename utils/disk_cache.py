@@ -0,0 +1,115 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    Return the sha256 hex digest of a file's bytes.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent key/value cache backed by a single SQLite file.
+
+    Entries are evicted least-recently-used first once the total stored
+    size exceeds max_bytes, and treated as missing once older than ttl
+    seconds (if a ttl is set). Hit/miss counters are kept per process.
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the cache usable
+        # from threads and worker processes alike.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def set(self, key, value):
+        """
+        Store value under key and evict old entries if over the size limit.
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed ASC").fetchall():
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def stats(self):
+        """
+        Return a dict with hit/miss counters and the current entry count and size.
+        """
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
@@ -0,0 +1,154 @@
+import os
+import time
+import requests
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from utils.metrics import STAGE_SECONDS, timer
+
+load_dotenv()
+API_KEY = os.getenv("GDRIVE_API_KEY")
+# Overridable so a local stand-in for the Drive v3 files endpoint
+# (utils/mock_drive_server.py) can be used.
+DRIVE_API_URL = os.getenv("DRIVE_API_URL", "https://www.googleapis.com/drive/v3/files")
+DRIVE_DOWNLOAD_WORKERS = int(os.getenv("DRIVE_DOWNLOAD_WORKERS", "8"))
+DRIVE_DOWNLOAD_RETRIES = int(os.getenv("DRIVE_DOWNLOAD_RETRIES", "3"))
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Caps concurrent downloads across all callers (upload tab, sync, CLI).
+_download_slots = threading.BoundedSemaphore(DRIVE_DOWNLOAD_WORKERS)
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Shared keep-alive session for all Drive requests. Connection-level errors
+    and 429/5xx responses are retried with backoff (honoring Retry-After).
+    download_drive_file() only adds retries for bodies that break off.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=DRIVE_DOWNLOAD_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=DRIVE_DOWNLOAD_WORKERS * 2,
+                max_retries=retry
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def _chunk_size(response):
+    # Aim for ~8 chunks per file, clamped so small files don't use tiny reads
+    # and large ones don't buffer too much in memory.
+    length = int(response.headers.get("Content-Length") or 0)
+    if not length:
+        return 1024 * 1024
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, length // 8))
+
+# ----- Google Drive API Helper Functions -----
+def list_drive_files(folder_id, modified_since=None):
+    """
+    List all public files in a specific Google Drive folder using an API key.
+    If modified_since (an RFC 3339 timestamp) is given, only files modified
+    at or after it are listed.
+    Returns a list of files with name, id, and modifiedTime.
+    """
+    files = []
+    page_token = None
+    query = f"'{folder_id}' in parents and trashed=false"
+    if modified_since:
+        query += f" and modifiedTime >= '{modified_since}'"
+    
+    while True:
+        params = {
+            'q': query,
+            'fields': 'nextPageToken,files(id,name,modifiedTime)',
+            'key': API_KEY,
+            'orderBy': 'modifiedTime desc',
+            'pageToken': page_token if page_token else ''
+        }
+        response = get_session().get(DRIVE_API_URL, params=params)
+        response.raise_for_status()  
+        
+        data = response.json()
+        for file in data.get('files', []):
+            files.append({
+                'name': file['name'],
+                'id': file['id'],
+                'modifiedTime': file.get('modifiedTime', 'N/A')
+            })
+        
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            break
+    
+    return files
+
+def download_drive_file(file_id, file_name):
+    """
+    Download a file from Google Drive to a temporary location using an API key.
+    Uses the shared session (whose urllib3 Retry handles connection errors
+    and 429/5xx responses) and an adaptive chunk size. A body read that
+    breaks off after the response started (which urllib3 can't retry) is
+    restarted up to DRIVE_DOWNLOAD_RETRIES times. At most
+    DRIVE_DOWNLOAD_WORKERS downloads run at once per process.
+    Returns the path to the temporary file.
+    """
+    download_url = f"{DRIVE_API_URL}/{file_id}?alt=media&key={API_KEY}"
+    with _download_slots, timer(STAGE_SECONDS, stage="download"):
+        for attempt in range(DRIVE_DOWNLOAD_RETRIES + 1):
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1])
+            reading_body = False
+            try:
+                with get_session().get(download_url, stream=True, timeout=(10, 60)) as response:
+                    response.raise_for_status()
+                    reading_body = True
+                    for chunk in response.iter_content(chunk_size=_chunk_size(response)):
+                        if chunk:
+                            temp_file.write(chunk)
+                temp_file.close()
+                return temp_file.name
+            except Exception as e:
+                temp_file.close()
+                os.remove(temp_file.name)
+                body_error = isinstance(e, (
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.ReadTimeout,
+                ))
+                # Errors before the body started were already retried by the adapter.
+                if not (reading_body and body_error) or attempt == DRIVE_DOWNLOAD_RETRIES:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                print(f"⚠️ Download of {file_name} broke off ({e}); retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+def download_drive_files(files, max_workers=None):
+    """
+    Download many files ({"id", "name"} dicts) in parallel.
+    Yields (file, temp_path, error) in completion order, so callers can start
+    processing each file as soon as it lands; exactly one of temp_path/error
+    is None.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or DRIVE_DOWNLOAD_WORKERS) as pool:
+        futures = {pool.submit(download_drive_file, f["id"], f["name"]): f for f in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+# ----- End Google Drive Helpers -----
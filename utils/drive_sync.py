@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import argparse
+
+from utils.drive import list_drive_files, download_drive_files
+from utils.metrics import start_metrics_server
+
+DRIVE_SYNC_STATE_DIR = os.getenv("DRIVE_SYNC_STATE_DIR", os.path.join(".cache", "drive_sync"))
+SUPPORTED_EXTENSIONS = (".pdf", ".doc", ".docx", ".xlsx")
+
+
+#Watermark State
+def _state_path(folder_id):
+    return os.path.join(DRIVE_SYNC_STATE_DIR, f"{folder_id}.json")
+
+def load_state(folder_id):
+    """
+    Per-folder sync state:
+      watermark: RFC 3339 modifiedTime; files older than this are never re-listed.
+      files: {file_id: modifiedTime} of files at/after the watermark already processed.
+    """
+    try:
+        with open(_state_path(folder_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermark": None, "files": {}}
+
+def save_state(folder_id, state):
+    os.makedirs(DRIVE_SYNC_STATE_DIR, exist_ok=True)
+    tmp_path = _state_path(folder_id) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _state_path(folder_id))
+
+
+#Change Detection
+def find_changed_files(folder_id, state):
+    """
+    Return the supported files in the folder that are new or changed since the
+    last sync. Only files modified at or after the watermark are listed.
+    """
+    listed = list_drive_files(folder_id, modified_since=state.get("watermark"))
+    seen = state.get("files", {})
+    return [
+        f for f in listed
+        if f["name"].lower().endswith(SUPPORTED_EXTENSIONS) and seen.get(f["id"]) != f["modifiedTime"]
+    ]
+
+def advance_state(state, changed_files, failed_ids):
+    """
+    Record processed files and move the watermark forward. The watermark
+    stops at the oldest failed file so that it is listed (and retried) again.
+    """
+    files = dict(state.get("files", {}))
+    for f in changed_files:
+        if f["id"] not in failed_ids:
+            files[f["id"]] = f["modifiedTime"]
+
+    candidates = [state["watermark"]] if state.get("watermark") else []
+    failed_times = [f["modifiedTime"] for f in changed_files if f["id"] in failed_ids]
+    if failed_times:
+        watermark = min(failed_times)
+    else:
+        watermark = max(candidates + [f["modifiedTime"] for f in changed_files], default=None)
+
+    # Entries older than the watermark will never be listed again.
+    if watermark:
+        files = {file_id: modified for file_id, modified in files.items() if modified >= watermark}
+    return {"watermark": watermark, "files": files}
+
+
+#Sync
+def default_processor(downloaded):
+    """
+    Feed (file, temp_path) pairs into the batch pipeline as they arrive and
+    yield (file, result) pairs. Imported lazily so listing alone stays light.
+    """
+    from main_final import iter_process_resume_jobs
+    by_path = {}
+
+    def jobs():
+        for f, path in downloaded:
+            by_path[path] = f
+            yield path, f["name"]
+
+    for result in iter_process_resume_jobs(jobs()):
+        yield by_path[result["file_path"]], result
+
+def sync_folder(folder_id, processor=default_processor, dry_run=False):
+    """
+    One incremental sync pass: find new/changed files, download them, hand
+    each one to processor as soon as it lands, and persist the new watermark.
+    Returns a list of per-file result dicts (with "error" on failure).
+    """
+    state = load_state(folder_id)
+    changed = find_changed_files(folder_id, state)
+    print(f"🔄 {len(changed)} new or changed file(s) in folder {folder_id}.")
+    if dry_run or not changed:
+        return [{"file_name": f["name"], "file_id": f["id"], "modifiedTime": f["modifiedTime"]} for f in changed]
+
+    results = []
+    failed_ids = set()
+    temp_paths = []
+
+    def downloaded():
+        for f, temp_path, error in download_drive_files(changed):
+            if error is not None:
+                failed_ids.add(f["id"])
+                results.append({"file_name": f["name"], "file_id": f["id"], "error": str(error), "stage": "download"})
+                continue
+            temp_paths.append(temp_path)
+            yield f, temp_path
+
+    try:
+        for f, result in processor(downloaded()):
+            result = dict(result, file_id=f["id"])
+            if "error" in result:
+                failed_ids.add(f["id"])
+            results.append(result)
+    finally:
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    save_state(folder_id, advance_state(state, changed, failed_ids))
+    return results
+
+def poll_folder(folder_id, interval, processor=default_processor):
+    """
+    Run sync_folder every interval seconds until interrupted.
+    """
+    while True:
+        try:
+            sync_folder(folder_id, processor)
+        except Exception as e:
+            print(f"⚠️ Sync of folder {folder_id} failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync a Google Drive folder into the resume pipeline.")
+    parser.add_argument("folder_id")
+    parser.add_argument("--interval", type=float, default=0, help="Poll every N seconds (default: run once).")
+    parser.add_argument("--dry-run", action="store_true", help="Only list new/changed files.")
+    args = parser.parse_args()
+
+    if args.interval > 0:
+        start_metrics_server()
+        poll_folder(args.folder_id, args.interval)
+    else:
+        for result in sync_folder(args.folder_id, dry_run=args.dry_run):
+            status = f"ERROR ({result.get('stage')}): {result['error']}" if "error" in result else result.get("unique_id", "new")
+            print(f"{result['file_name']}: {status}")
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import functools
+import subprocess
+
+# Entry points and extractor backends whose import cost we track.
+TRACKED_MODULES = [
+    "main_final",
+    "utils.retrieve_doc",
+    "knowledge.pdf_docling",
+    "knowledge.parse_pdf",
+    "knowledge.pdf_inspect",
+    "knowledge.parsedoc",
+    "knowledge.parse_excel",
+    "openai",
+]
+
+# Run the child interpreters from the repository root so repo modules resolve
+# whatever the caller's working directory is.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_importtime(code):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+
+def _parse_importtime(stderr):
+    """
+    Yield (name, cumulative_seconds, depth) for each importtime line;
+    depth 0 is a top-level import, 1 an import it triggered, and so on.
+    """
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name_field = line.partition(":")[2].split("|")
+        # Nested imports are indented by two spaces per level.
+        depth = (len(name_field) - len(name_field.lstrip()) - 1) // 2
+        yield name_field.strip(), int(cumulative_us) / 1e6, depth
+
+
+@functools.lru_cache(maxsize=None)
+def _startup_modules():
+    # Modules the interpreter imports before running any code (site, encodings, ...).
+    return frozenset(name for name, _, _ in _parse_importtime(_run_importtime("pass").stderr))
+
+
+def measure_import_time(module, top=5):
+    """
+    Import module in a fresh interpreter with `python -X importtime` and
+    return {"module", "seconds", "heaviest": [(package, seconds), ...]}.
+    seconds is the cumulative import time of module itself; heaviest lists
+    the packages it imports directly with the largest cumulative import time.
+    """
+    proc = _run_importtime(f"import {module}")
+    if proc.returncode != 0:
+        last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+        return {"module": module, "error": last_line}
+
+    startup = _startup_modules()
+    cumulative = {}
+    for name, seconds, depth in _parse_importtime(proc.stderr):
+        if name == module or (depth <= 1 and name not in startup):
+            cumulative[name] = max(cumulative.get(name, 0), seconds)
+
+    heaviest = sorted(
+        ((name, seconds) for name, seconds in cumulative.items() if name != module),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+    return {"module": module, "seconds": cumulative.get(module, 0.0), "heaviest": heaviest}
+
+
+def import_report(modules=TRACKED_MODULES):
+    return [measure_import_time(module) for module in modules]
+
+
+if __name__ == "__main__":
+    modules = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    report = import_report(modules or TRACKED_MODULES)
+    if "--json" in sys.argv:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        for entry in report:
+            if "error" in entry:
+                print(f"❌ {entry['module']}: {entry['error']}")
+                continue
+            heaviest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in entry["heaviest"])
+            print(f"📦 {entry['module']}: {entry['seconds']:.2f}s  ({heaviest})")
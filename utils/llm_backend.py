@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import random
+import hashlib
+import functools
+import importlib
+import threading
+
+from utils.compact import count_tokens
+
+# "openai", "mock", or "package.module:ClassName" for an out-of-tree backend.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+MOCK_LLM_RESPONSE_FILE = os.getenv("MOCK_LLM_RESPONSE_FILE", "final_output.json")
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "0"))
+MOCK_LLM_JITTER_MS = float(os.getenv("MOCK_LLM_JITTER_MS", "0"))
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+MOCK_LLM_SEED = os.getenv("MOCK_LLM_SEED", "0")
+
+
+class OpenAIBackend:
+    """
+    Structured output through the OpenAI API (or any compatible server at
+    base_url). One client, and so one HTTP connection pool, per backend.
+    The client's own retries are off; main_final.run_stage() retries.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key=None, base_url=LLM_BASE_URL):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url, max_retries=0)
+
+    def parse(self, model, temperature, messages, response_format):
+        """
+        Return (message JSON with "parsed", usage dict).
+        """
+        completion = self.client.beta.chat.completions.parse(
+            temperature=temperature,
+            model=model,
+            messages=messages,
+            response_format=response_format,
+        )
+        usage = completion.usage
+        return (
+            completion.choices[0].message.model_dump_json(exclude_none=True),
+            {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            },
+        )
+
+
+class MockLLMError(Exception):
+    """
+    Injected failure; status_code makes utils.retry treat it like the real
+    provider error (429 -> rate_limit, 500 -> server).
+    """
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"mock LLM error {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _mock_rng(messages, attempt_salt=""):
+    digest = hashlib.sha256(
+        (MOCK_LLM_SEED + attempt_salt + json.dumps(messages, ensure_ascii=False)).encode("utf-8")
+    ).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_canned(response_file):
+    with open(response_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def canned_response(fields, response_file=MOCK_LLM_RESPONSE_FILE):
+    """
+    The canned resume (final_output.json) restricted to the given top-level
+    fields, so section sub-schemas get only their own sections.
+    """
+    return {key: value for key, value in _load_canned(response_file).items() if key in fields}
+
+
+class MockBackend:
+    """
+    Deterministic offline stand-in: returns the canned resume after a
+    configurable latency, failing a configurable fraction of calls with 429
+    or 500. The same input always gets the same latency and outcome
+    (seeded by MOCK_LLM_SEED + the messages); a retry of a failed call is
+    re-drawn so retries can succeed.
+    """
+
+    name = "mock"
+
+    def __init__(self, latency_ms=MOCK_LLM_LATENCY_MS, jitter_ms=MOCK_LLM_JITTER_MS,
+                 error_rate=MOCK_LLM_ERROR_RATE, response_file=MOCK_LLM_RESPONSE_FILE):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.response_file = response_file
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def parse(self, model, temperature, messages, response_format):
+        key = hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        rng = _mock_rng(messages, str(attempt))
+
+        time.sleep(max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        if rng.random() < self.error_rate:
+            raise MockLLMError(429, retry_after=0.1) if rng.random() < 0.5 else MockLLMError(500)
+
+        parsed = response_format.model_validate(canned_response(response_format.model_fields, self.response_file))
+        content = parsed.model_dump_json(exclude_none=True)
+        prompt_tokens = sum(count_tokens(m["content"], model) or len(m["content"]) for m in messages)
+        completion_tokens = count_tokens(content, model) or len(content)
+        message = {"content": content, "role": "assistant", "parsed": parsed.model_dump(exclude_none=True)}
+        return (
+            json.dumps(message, ensure_ascii=False),
+            {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+
+LLM_BACKENDS = {
+    "openai": OpenAIBackend,
+    "mock": MockBackend,
+}
+
+
+def create_backend(name=LLM_BACKEND, **kwargs):
+    """
+    Instantiate a backend by registry name or "package.module:ClassName".
+    """
+    if name in LLM_BACKENDS:
+        return LLM_BACKENDS[name](**kwargs)
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)(**kwargs)
+    raise ValueError(f"Unknown LLM backend: {name}")
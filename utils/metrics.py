@@ -0,0 +1,214 @@
+import os
+import time
+import uuid
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Expose /metrics on this port (see start_metrics_server) ...
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# ... and/or write the same text to this file at exit and on write_metrics_file().
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+# Seconds; covers everything from a cache lookup to a long LLM generation.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+RATE_BUCKETS = (5, 10, 20, 40, 80, 160, 320)
+
+# Trace ID of the resume currently being processed in this context.
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
+
+#Trace IDs
+def new_trace_id():
+    """
+    Start a new trace in the current context and return its ID.
+    """
+    trace_id = uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+def current_trace_id():
+    return trace_id_var.get()
+
+
+#Metric Types
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def samples(self):
+        with self._lock:
+            samples = []
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry["counts"]):
+                    samples.append((f"{self.name}_bucket", key + (("le", f"{bound:g}"),), count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), entry["count"]))
+                samples.append((f"{self.name}_sum", key, entry["sum"]))
+                samples.append((f"{self.name}_count", key, entry["count"]))
+            return samples
+
+
+#Registry
+_metrics = {}
+_registry_lock = threading.Lock()
+
+def _get_or_create(cls, name, help_text, **kwargs):
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = cls(name, help_text, **kwargs)
+        return _metrics[name]
+
+def counter(name, help_text=""):
+    return _get_or_create(Counter, name, help_text)
+
+def histogram(name, help_text="", buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help_text, buckets=buckets)
+
+
+# Pipeline metrics (names follow Prometheus conventions).
+STAGE_SECONDS = histogram("resume_stage_seconds", "Duration of one pipeline stage for one resume.")
+FUNCTION_SECONDS = histogram("resume_function_seconds", "Duration of instrumented functions.")
+PARSE_SECONDS = histogram("resume_parse_seconds", "Extractor run time on a parse-cache miss.")
+LLM_QUEUE_SECONDS = histogram("llm_queue_seconds", "Time an LLM call waited for a worker before starting.")
+LLM_GENERATION_SECONDS = histogram("llm_generation_seconds", "Time spent in the LLM backend per call.")
+LLM_TOKENS = counter("llm_tokens_total", "Tokens sent to / generated by the LLM.")
+RESUME_TOKENS = histogram("resume_llm_tokens", "Total LLM tokens per resume.", buckets=TOKEN_BUCKETS)
+LLM_TOKENS_PER_SECOND = histogram("llm_tokens_per_second", "Completion tokens per second of generation.", buckets=RATE_BUCKETS)
+EXTRACTOR_IMPORT_SECONDS = histogram("extractor_import_seconds", "First-import time of extractor modules.")
+PDF_ROUTES = counter("pdf_engine_routes_total", "PDFs routed to each extraction engine.")
+CACHE_REQUESTS = counter("cache_requests_total", "Parse/LLM cache lookups by result.")
+DB_WRITE_SECONDS = histogram("mongo_write_seconds", "Duration of Mongo insert calls.")
+RETRIES = counter("stage_retries_total", "Retried stage attempts by failure kind.")
+RESUMES = counter("resumes_processed_total", "Resumes processed by outcome.")
+
+
+@contextmanager
+def timer(metric, time_stats=None, key=None, **labels):
+    """
+    Observe the duration of the block in histogram metric; if time_stats
+    and key are given, also add the seconds to time_stats[key].
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+        metric.observe(elapsed, **labels)
+        if time_stats is not None and key:
+            time_stats[key] = time_stats.get(key, 0) + elapsed
+
+
+#Exposition
+def render_prometheus():
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    with _registry_lock:
+        metrics = list(_metrics.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, key, value in metric.samples():
+            lines.append(f"{name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_metrics_file(path=None):
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+if METRICS_FILE:
+    atexit.register(write_metrics_file)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """
+    Serve /metrics from a daemon thread (once per process). Does nothing
+    unless a port is given or METRICS_PORT is set. Returns the server.
+    """
+    global _server
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-server").start()
+            print(f"📈 Metrics on http://{host}:{port}/metrics")
+        return _server
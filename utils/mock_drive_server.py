@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_MODIFIED_SINCE = re.compile(r"modifiedTime >= '([^']+)'")
+
+
+class MockDriveFilesHandler(BaseHTTPRequestHandler):
+    """
+    The parts of the Drive v3 files endpoint that utils.drive uses:
+      GET /files?q=...&pageToken=...    list, honoring "modifiedTime >= '...'"
+      GET /files/<id>?alt=media         file content
+    Files live in server.files; ids in server.unavailable answer 404, and
+    server.broken[id] downloads are cut off halfway through the body.
+    Point utils.drive at it with DRIVE_API_URL=http://127.0.0.1:8766/files.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        parts = url.path.rstrip("/").split("/")
+        with self.server.lock:
+            self.server.requests.append((url.path, params))
+            if parts[-1] == "files":
+                self._list(params)
+            elif len(parts) >= 2 and parts[-2] == "files" and params.get("alt") == "media":
+                self._download(parts[-1])
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {url.path}"}})
+
+    def _list(self, params):
+        match = _MODIFIED_SINCE.search(params.get("q", ""))
+        files = [
+            {"id": file_id, "name": f["name"], "modifiedTime": f["modifiedTime"]}
+            for file_id, f in self.server.files.items()
+            if match is None or f["modifiedTime"] >= match.group(1)
+        ]
+        files.sort(key=lambda f: f["modifiedTime"], reverse=True)
+        start = int(params.get("pageToken") or 0)
+        end = start + self.server.page_size
+        payload = {"files": files[start:end]}
+        if end < len(files):
+            payload["nextPageToken"] = str(end)
+        self._send_json(200, payload)
+
+    def _download(self, file_id):
+        if file_id not in self.server.files or file_id in self.server.unavailable:
+            self._send_json(404, {"error": {"code": 404, "message": f"File not found: {file_id}"}})
+            return
+        content = self.server.files[file_id]["content"]
+        if self.server.broken.get(file_id, 0) > 0:
+            self.server.broken[file_id] -= 1
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content[:len(content) // 2])
+            self.close_connection = True
+            return
+        self._send(200, content, "application/octet-stream")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8766, page_size=100):
+    """
+    Build (but don't start) the mock server with no files; port=0 picks a
+    free port. Add files with put_file() and run it with serve_forever().
+    """
+    server = ThreadingHTTPServer((host, port), MockDriveFilesHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.files = {}
+    server.unavailable = set()
+    server.broken = {}
+    server.requests = []
+    server.page_size = page_size
+    return server
+
+
+def put_file(server, file_id, name, modified_time, content=b""):
+    """
+    Add or replace a file; modified_time is an RFC 3339 string like Drive's.
+    """
+    with server.lock:
+        server.files[file_id] = {"name": name, "modifiedTime": modified_time, "content": content}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Drive v3 files endpoint serving a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port)
+    for name in sorted(os.listdir(args.directory)):
+        path = os.path.join(args.directory, name)
+        if os.path.isfile(path):
+            modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat(timespec="milliseconds")
+            with open(path, "rb") as f:
+                put_file(server, name, name, modified.replace("+00:00", "Z"), f.read())
+    print(f"🧪 Mock Drive server listening on http://{args.host}:{server.server_port}/files")
+    server.serve_forever()
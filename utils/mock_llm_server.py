@@ -0,0 +1,111 @@
+import json
+import time
+import itertools
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.llm_backend import (
+    MOCK_LLM_LATENCY_MS,
+    MOCK_LLM_JITTER_MS,
+    MOCK_LLM_ERROR_RATE,
+    MOCK_LLM_RESPONSE_FILE,
+    _mock_rng,
+    canned_response,
+)
+
+
+class MockChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    POST /v1/chat/completions returning the canned resume as a structured
+    output, with the server's latency and error settings. Point the
+    "openai" backend at it (LLM_BASE_URL=http://127.0.0.1:8765/v1) to load
+    test the real client and connection pool without calling the API.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        config = self.server.config
+        request_id = next(self.server.request_ids)
+        rng = _mock_rng(request.get("messages", []), str(request_id))
+        time.sleep(max(0.0, config["latency_ms"] + rng.uniform(-config["jitter_ms"], config["jitter_ms"])) / 1000)
+        if rng.random() < config["error_rate"]:
+            if rng.random() < 0.5:
+                self._send_json(429, {"error": {"message": "mock rate limit", "type": "rate_limit_error"}}, {"Retry-After": "0.1"})
+            else:
+                self._send_json(500, {"error": {"message": "mock server error", "type": "server_error"}})
+            return
+
+        schema = ((request.get("response_format") or {}).get("json_schema") or {}).get("schema") or {}
+        content = json.dumps(
+            canned_response(schema.get("properties", {}), config["response_file"]), ensure_ascii=False
+        )
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{request_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_chars + len(content),
+            },
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8765, latency_ms=MOCK_LLM_LATENCY_MS, jitter_ms=MOCK_LLM_JITTER_MS,
+                error_rate=MOCK_LLM_ERROR_RATE, response_file=MOCK_LLM_RESPONSE_FILE):
+    """
+    Build (but don't start) the mock server; port=0 picks a free port.
+    Run it with serve_forever(), e.g. in a daemon thread.
+    """
+    server = ThreadingHTTPServer((host, port), MockChatCompletionsHandler)
+    server.daemon_threads = True
+    server.request_ids = itertools.count(1)
+    server.config = {
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "error_rate": error_rate,
+        "response_file": response_file,
+    }
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the chat completions API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=MOCK_LLM_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=MOCK_LLM_JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=MOCK_LLM_ERROR_RATE)
+    parser.add_argument("--response-file", default=MOCK_LLM_RESPONSE_FILE)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.response_file)
+    print(f"🧪 Mock LLM server listening on http://{args.host}:{server.server_port}/v1")
+    server.serve_forever()
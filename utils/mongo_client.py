@@ -0,0 +1,81 @@
+import os
+import threading
+import certifi
+from dotenv import load_dotenv
+from pymongo.mongo_client import MongoClient
+
+load_dotenv()
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "resume_db")
+MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME", "resumes")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# MONGODB_URI=mongomock:// swaps in an in-memory stand-in (requires mongomock).
+MOCK_URI_PREFIX = "mongomock://"
+
+_client = None
+_lock = threading.Lock()
+
+
+def client_options():
+    """
+    Keyword arguments shared by every client we create (sync and async).
+    """
+    return {
+        "tlsCAFile": certifi.where(),
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+
+
+def _create_client():
+    if MONGODB_URI and MONGODB_URI.startswith(MOCK_URI_PREFIX):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(MONGODB_URI, **client_options())
+
+
+def get_client():
+    """
+    Return the process-wide MongoClient, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the shared client, e.g. with mongomock.MongoClient() in tests
+    and benchmarks. Returns the previous client (which is not closed).
+    """
+    global _client
+    with _lock:
+        previous, _client = _client, client
+    return previous
+
+
+def get_db():
+    return get_client()[MONGO_DB_NAME]
+
+
+def get_collection(name=MONGO_COLLECTION_NAME):
+    return get_db()[name]
+
+
+def close_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
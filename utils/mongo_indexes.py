@@ -0,0 +1,111 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, ConnectionFailure
+
+# Fields holding the sha256 of the original file bytes / normalized parsed text.
+CONTENT_HASH_FIELD = "content_hash"
+TEXT_HASH_FIELD = "text_hash"
+
+RESUME_INDEXES = [
+    # Saved-results listing: newest first, with _id as tie-breaker for paging.
+    IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_desc"),
+    IndexModel([("unique_id", ASCENDING)], name="unique_id_unique", unique=True),
+    IndexModel([("file_name", ASCENDING)], name="file_name"),
+    IndexModel([(CONTENT_HASH_FIELD, ASCENDING)], name="content_hash", sparse=True),
+    IndexModel([(TEXT_HASH_FIELD, ASCENDING)], name="text_hash", sparse=True),
+]
+
+_ensured = set()
+
+
+def ensure_indexes(collection, force=False):
+    """
+    Create the resumes collection indexes if they don't exist yet.
+    Idempotent, and only talks to the server once per collection per process
+    unless force is set. Returns the names of indexes that could not be created
+    (e.g. unique_id_unique when existing documents share a unique_id).
+    """
+    if collection.full_name in _ensured and not force:
+        return []
+    failed = []
+    for index in RESUME_INDEXES:
+        name = index.document["name"]
+        try:
+            collection.create_indexes([index])
+        except ConnectionFailure as e:
+            # Database unreachable: don't block startup, try again next time.
+            print(f"⚠️ Could not reach MongoDB to ensure indexes: {e}")
+            return [model.document["name"] for model in RESUME_INDEXES]
+        except OperationFailure as e:
+            print(f"⚠️ Could not create index {name} on {collection.full_name}: {e}")
+            failed.append(name)
+    _ensured.add(collection.full_name)
+    return failed
+
+
+def _hot_queries(collection):
+    """
+    query name -> (cursor, indexes it must use or None for any index).
+    """
+    # Imported here to avoid circular imports with utils.retrieve_doc / utils.dedup.
+    from utils.retrieve_doc import LIST_PROJECTION, LIST_SORT
+    from utils.dedup import duplicate_filter, DUPLICATE_SORT
+
+    def dedup_query(**hashes):
+        # Exactly what find_duplicate() runs for every resume.
+        return collection.find(duplicate_filter(**hashes)).sort(DUPLICATE_SORT).limit(1)
+
+    return {
+        "list_page": (collection.find({}, LIST_PROJECTION).sort(LIST_SORT).limit(20), None),
+        "by_unique_id": (collection.find({"unique_id": ""}), None),
+        "by_file_name": (collection.find({"file_name": ""}), None),
+        "by_content_hash": (collection.find({CONTENT_HASH_FIELD: ""}), None),
+        "by_text_hash": (collection.find({TEXT_HASH_FIELD: ""}), None),
+        # The planner may prefer walking timestamp_desc for the sort; that
+        # scans the whole collection, so require the hash indexes here.
+        "find_duplicate_bytes": (dedup_query(content_hash=""), {"content_hash"}),
+        "find_duplicate": (dedup_query(content_hash="", text_hash=""), {"content_hash", "text_hash"}),
+    }
+
+
+def _plan_indexes(plan):
+    """
+    Collect (stage, indexName) pairs from an explain() winning plan tree.
+    """
+    found = []
+    if isinstance(plan, dict):
+        if plan.get("stage") in ("IXSCAN", "COUNT_SCAN", "DISTINCT_SCAN", "IDHACK", "EXPRESS_IXSCAN"):
+            found.append((plan["stage"], plan.get("indexName", "_id_")))
+        for key in ("inputStage", "queryPlan", "innerStage", "outerStage"):
+            found.extend(_plan_indexes(plan.get(key)))
+        for child in plan.get("inputStages", []):
+            found.extend(_plan_indexes(child))
+    return found
+
+
+def explain_hot_queries(collection):
+    """
+    Run explain() on the app's hot queries and report whether each one uses
+    an index (for the dedup queries: the hash indexes it needs).
+    Returns {query_name: {"uses_index": bool, "indexes": [...]}}.
+    """
+    report = {}
+    for name, (cursor, expected) in _hot_queries(collection).items():
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        indexes = [index_name for _, index_name in _plan_indexes(winning_plan)]
+        report[name] = {
+            "uses_index": bool(indexes) and (expected is None or expected <= set(indexes)),
+            "indexes": indexes,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    from utils.mongo_client import get_collection
+
+    collection = get_collection()
+
+    failed = ensure_indexes(collection)
+    print(f"Indexes ensured on {collection.full_name}" + (f" (failed: {', '.join(failed)})" if failed else ""))
+    for name, result in explain_hot_queries(collection).items():
+        status = "✅" if result["uses_index"] else "❌ COLLSCAN"
+        print(f"{status} {name}: {', '.join(result['indexes']) or '-'}")
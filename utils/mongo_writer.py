@@ -0,0 +1,103 @@
+import atexit
+import threading
+from concurrent.futures import Future
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from utils.metrics import DB_WRITE_SECONDS, timer
+
+
+class BulkWriter:
+    """
+    Write-behind buffer for a Mongo collection.
+
+    Documents passed to submit() are grouped into unordered insert_many calls,
+    flushed once batch_size documents are waiting or flush_interval seconds
+    after the first one arrived, whichever comes first. submit() returns a
+    Future that resolves to the document's inserted _id (or raises the
+    per-document write error). Pending documents are flushed on close() and
+    at interpreter exit.
+    """
+
+    def __init__(self, collection, batch_size=50, flush_interval=0.5):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="mongo-bulk-writer")
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, doc):
+        """
+        Queue doc for insertion and return a Future for its inserted _id.
+        """
+        future = Future()
+        # Assign the _id client-side so it is known even before the flush.
+        doc.setdefault("_id", ObjectId())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BulkWriter is closed")
+            self._buffer.append((doc, future))
+            # Wake the writer for the first document (to start the interval)
+            # and again once a full batch is waiting.
+            if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+                # Give the batch time to fill up, unless it is already full.
+                if len(self._buffer) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                batch = self._buffer[:self.batch_size]
+                self._buffer = self._buffer[self.batch_size:]
+            self._write(batch)
+
+    def _write(self, batch):
+        docs = [doc for doc, _ in batch]
+        errors = {}
+        try:
+            with timer(DB_WRITE_SECONDS, op="insert_many"):
+                self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = error
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for index, (doc, future) in enumerate(batch):
+            if index in errors:
+                future.set_exception(RuntimeError(f"Insert failed: {errors[index].get('errmsg')}"))
+            else:
+                future.set_result(doc["_id"])
+        print(f"Bulk inserted {len(batch) - len(errors)}/{len(batch)} documents.")
+
+    def flush(self, timeout=None):
+        """
+        Block until everything submitted so far has been written.
+        """
+        with self._cond:
+            pending = [future for _, future in self._buffer]
+            self._cond.notify()
+        for future in pending:
+            try:
+                future.exception(timeout)
+            except Exception:
+                pass
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -1,31 +1,46 @@
-import os
-import certifi
-from datetime import datetime
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-from dotenv import load_dotenv
+from pymongo import DESCENDING
+from utils.mongo_client import get_collection
 
-load_dotenv()
-MONGODB_URI = os.getenv("MONGODB_URI")
-
-# MongoDB Connection
-client = MongoClient(
-    MONGODB_URI,
-    tlsCAFile=certifi.where(),
-    serverSelectionTimeoutMS=5000
-)
-db = client["resume_db"]
-collection = db["resumes"]
+# Fields needed to render the saved-results list; full llm_output is loaded on demand.
+LIST_PROJECTION = {
+    "file_name": 1,
+    "unique_id": 1,
+    "timestamp": 1,
+    "time_stats.total_time": 1,
+}
+LIST_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
 
 def get_all_documents():
     """
     Retrieve all documents from the resumes collection.
     Returns a list of documents sorted by timestamp (newest first).
     """
-    documents = list(collection.find({}))
-    # Sort documents by timestamp descending (newest first)
-    documents.sort(key=lambda doc: doc.get("timestamp", datetime.min), reverse=True)
-    return documents
+    return list(get_collection().find({}).sort(LIST_SORT))
+
+def get_documents_page(page_size=20, after=None):
+    """
+    Retrieve one page of list rows (LIST_PROJECTION fields only), newest first.
+    Sorting and paging happen on the server.
+
+    after is the cursor returned with the previous page, i.e. the
+    (timestamp, _id) of its last row; pass None for the first page.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    query = {}
+    if after is not None:
+        last_timestamp, last_id = after
+        query = {"$or": [
+            {"timestamp": {"$lt": last_timestamp}},
+            {"timestamp": last_timestamp, "_id": {"$lt": last_id}},
+        ]}
+    # Fetch one extra row to know whether another page exists.
+    documents = list(get_collection().find(query, LIST_PROJECTION).sort(LIST_SORT).limit(page_size + 1))
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = (last.get("timestamp"), last["_id"])
+    return documents, next_cursor
 
 def get_document_by_object_id(object_id):
     """
@@ -34,7 +49,7 @@ def get_document_by_object_id(object_id):
     """
     from bson import ObjectId
     try:
-        document = collection.find_one({"_id": ObjectId(object_id)})
+        document = get_collection().find_one({"_id": ObjectId(object_id)})
         return document
     except Exception as e:
         print(f"Error retrieving document: {e}")
@@ -0,0 +1,171 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Failure kinds worth retrying; anything else ("length", "fatal") would fail
+# the same way again.
+RETRYABLE_KINDS = {"rate_limit", "timeout", "connection", "server", "circuit_open"}
+# Failure kinds that mean the provider itself is degraded.
+PROVIDER_FAILURE_KINDS = {"rate_limit", "timeout", "connection", "server"}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class StageError(Exception):
+    """
+    A pipeline stage that failed for good. The original exception is
+    available as __cause__.
+    """
+    def __init__(self, stage, kind, attempts, error):
+        super().__init__(f"{stage} failed after {attempts} attempt(s) ({kind}): {error}")
+        self.stage = stage
+        self.kind = kind
+        self.attempts = attempts
+
+
+def _exception_names(exc):
+    return {cls.__name__ for cls in type(exc).__mro__}
+
+
+def classify_error(exc):
+    """
+    Map an exception from openai, pymongo or requests to a failure kind:
+    "rate_limit", "timeout", "connection", "server", "circuit_open",
+    "length" or "fatal". Matched by class name so no client library has to
+    be imported here.
+    """
+    names = _exception_names(exc)
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if "LengthFinishReasonError" in names:
+        return "length"
+    if "RateLimitError" in names or status == 429:
+        return "rate_limit"
+    if names & {"APITimeoutError", "NetworkTimeout", "ExecutionTimeout", "ServerSelectionTimeoutError", "Timeout", "TimeoutError"}:
+        return "timeout"
+    if names & {"APIConnectionError", "AutoReconnect", "ConnectionFailure", "ConnectionError"}:
+        return "connection"
+    if isinstance(status, int) and status >= 500:
+        return "server"
+    return "fatal"
+
+
+def retry_after_seconds(exc):
+    """
+    Seconds the server asked us to wait (Retry-After / retry-after-ms), or None.
+    """
+    if getattr(exc, "retry_after", None) is not None:
+        return exc.retry_after
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base_delay, max_delay, retry_after=None):
+    """
+    Exponential backoff with full jitter for the given (1-based) attempt,
+    never shorter than the server's Retry-After.
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+def retry_call(func, *args, stage, max_attempts, base_delay, max_delay, on_retry=None, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying retryable failures up to
+    max_attempts in total. on_retry(stage, attempt, delay, exc) is called
+    before each wait. Raises StageError once the stage has failed for good.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            kind = classify_error(e)
+            if kind not in RETRYABLE_KINDS or attempt >= max_attempts:
+                raise StageError(stage, kind, attempt, e) from e
+            delay = backoff_delay(attempt, base_delay, max_delay, retry_after_seconds(e))
+            print(f"🔁 {stage} failed ({kind}: {e}); retry {attempt}/{max_attempts - 1} in {delay:.1f}s.")
+            if on_retry:
+                on_retry(stage, attempt, delay, e)
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a provider is degraded. After failure_threshold
+    consecutive provider failures the circuit opens for reset_timeout
+    seconds; then a single trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def _before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            remaining = self.reset_timeout - (time.time() - self.opened_at)
+            raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def _record(self, provider_failure):
+        with self._lock:
+            self._trial_in_flight = False
+            if not provider_failure:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"🚧 {self.name} circuit opened after {self.failures} consecutive failures.")
+                self.opened_at = time.time()
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(classify_error(e) in PROVIDER_FAILURE_KINDS)
+            raise
+        self._record(False)
+        return result
@@ -0,0 +1,130 @@
+import re
+import json
+from pydantic import create_model
+
+from utils.jp_schema import ResumeSchema
+
+# Independent groups of ResumeSchema fields, each extracted by its own call.
+# Model names end up in the structured-output request, so they stay ASCII.
+SECTION_GROUPS = {
+    "profile": ["個人的", "望ましい", "資格_"],
+    "summary": ["スキルサマリー"],
+    "work_history": ["職歴"],
+    "skills": ["スキル評価"],
+}
+WORK_HISTORY_SECTION = "work_history"
+
+# A line that starts a new project/assignment: a leading date ("2019年4月",
+# "2019/04", ...), optionally after table/heading/bullet markers, or an
+# explicit "プロジェクト名" / "案件" label.
+PROJECT_BOUNDARY = re.compile(
+    r"^[\s|#■◆●◇□・\-*【\[(（]*(\d{4}\s*[年/.\-]\s*\d{1,2}|(プロジェクト|案件|PJ)\s*(名|概要|\d|[:：]))"
+)
+
+
+def _section_model(section, fields):
+    class_name = "ResumeSection" + "".join(part.title() for part in section.split("_"))
+    return create_model(
+        class_name,
+        __doc__=ResumeSchema.__doc__,
+        **{name: (ResumeSchema.model_fields[name].annotation, ResumeSchema.model_fields[name]) for name in fields}
+    )
+
+
+SECTION_SCHEMAS = {section: _section_model(section, fields) for section, fields in SECTION_GROUPS.items()}
+
+
+def section_instruction(section, part=None, parts=None):
+    """
+    Extra system-prompt text telling the model which part of the schema this
+    call covers (and, for chunked work history, which slice of the text).
+    """
+    fields = "、".join(SECTION_GROUPS[section])
+    instruction = f"\n\n## **このリクエストの対象**\n- 今回は次のセクションのみを抽出すること: {fields}\n"
+    if parts and parts > 1:
+        instruction += (
+            f"- 入力は職務経歴の一部（{part}/{parts}）です。"
+            "このテキストに記載されているプロジェクトのみを抽出し、他の部分を推測しないこと。\n"
+        )
+    return instruction
+
+
+def split_projects(text):
+    """
+    Split text into segments at detected project boundaries. The first
+    segment also carries everything before the first boundary.
+    """
+    segments = []
+    current = []
+    for line in str(text).splitlines():
+        if PROJECT_BOUNDARY.match(line) and any(l.strip() for l in current):
+            segments.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        segments.append("\n".join(current))
+    return segments
+
+
+def chunk_segments(segments, max_tokens, count):
+    """
+    Greedily pack consecutive segments into chunks of at most max_tokens
+    (as measured by count). A single oversized segment becomes its own chunk.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for segment in segments:
+        tokens = count(segment)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _work_history_key(entry):
+    return (entry.get("会社名"), entry.get("プロジェクト名"), entry.get("期間開始"), entry.get("期間終了"))
+
+
+def merge_sections(section_outputs):
+    """
+    Merge {section: [parsed dict, ...]} into one validated ResumeSchema.
+    Work-history entries from all chunks are concatenated in order (exact
+    repeats from overlapping chunks are dropped); the other sections come
+    from their single call.
+    """
+    merged = {}
+    for section, outputs in section_outputs.items():
+        if section == WORK_HISTORY_SECTION:
+            entries, seen = [], set()
+            for output in outputs:
+                for entry in output.get("職歴") or []:
+                    key = _work_history_key(entry)
+                    if key in seen and any(key):
+                        continue
+                    seen.add(key)
+                    entries.append(entry)
+            if entries:
+                merged["職歴"] = entries
+        else:
+            for output in outputs:
+                merged.update({k: v for k, v in output.items() if v is not None})
+    return ResumeSchema.model_validate(merged)
+
+
+def to_llm_output(resume):
+    """
+    Serialize a merged ResumeSchema like call_openai()'s message dump, so
+    downstream code can keep reading json.loads(llm_output)["parsed"].
+    """
+    return json.dumps(
+        {
+            "content": resume.model_dump_json(exclude_none=True),
+            "role": "assistant",
+            "parsed": resume.model_dump(exclude_none=True),
+        },
+        ensure_ascii=False
+    )